@@ -0,0 +1,65 @@
+import os
+import sys
+from contextlib import redirect_stdout
+from timeit import default_timer as timer
+from typing import Callable
+
+from pylog.logic_variables import PyValue, Var, unify
+from pylog.sequence_options.linked_list import LinkedList
+from pylog.sequence_options.sequences import PyList
+from pylog.sequence_options.super_sequence import member
+
+"""
+Times some searches that make millions of calls to unify, member, and the other core predicates.
+Run it before and after a change to the core to see the change's effect.
+"""
+
+examples_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.extend([examples_dir, os.path.join(examples_dir, 'logic_puzzles')])
+
+from logic_puzzles.zebra_problem_2 import ZebraProblem
+from n_queens.n_queens import place_remaining_queens
+
+
+def best_of(n: int, run: Callable[[], object]) -> float:
+  """ The shortest of n runs, in seconds. """
+  times = []
+  for _ in range(n):
+    start = timer( )
+    run( )
+    times.append(timer( ) - start)
+  return min(times)
+
+
+def all_n_queens_solutions(board_width: int):
+  placement = [PyValue( ) for _ in range(board_width)]
+  return sum(1 for _ in place_remaining_queens(placement))
+
+
+def all_zebra_solutions(ListType):
+  problem = ZebraProblem( )
+  problem.ListType = ListType
+  with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+    return sum(1 for _ in problem.run_all_clues( ))
+
+
+def member_scan(n: int):
+  X = Var( )
+  A_List = PyList(list(range(n)))
+  return sum(1 for _ in member(X, A_List))
+
+
+def unify_calls(n: int):
+  X = Var( )
+  return sum(1 for i in range(n) for _ in unify(X, i))
+
+
+if __name__ == '__main__':
+  searches = [('8 queens, all solutions', lambda: all_n_queens_solutions(8)),
+              ('zebra, PyList', lambda: all_zebra_solutions(PyList)),
+              ('zebra, LinkedList', lambda: all_zebra_solutions(LinkedList)),
+              ('member over a 300-element PyList', lambda: member_scan(300)),
+              ('100,000 calls to unify', lambda: unify_calls(100_000)),
+              ]
+  for (name, search) in searches:
+    print(f'{name:40} {best_of(3, search):7.3f} sec')
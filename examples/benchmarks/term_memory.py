@@ -0,0 +1,66 @@
+import tracemalloc
+from typing import Callable
+
+from pylog.logic_variables import PyValue, Structure, Var
+
+"""
+Reports the number of bytes used per Var, PyValue, and Structure.
+
+"Before" is measured with the Dict_ classes below, which reproduce the layout Terms had before they
+used __slots__: a per-instance __dict__ holding a term_id (assigned eagerly on creation) along with
+the Term's other attributes.
+"""
+
+
+class Dict_Term:
+  term_count = 0
+
+  def __init__(self):
+    Dict_Term.term_count += 1
+    self.term_id = self.term_count
+
+
+class Dict_PyValue(Dict_Term):
+
+  def __init__(self, py_value=None):
+    self._py_value = py_value
+    super().__init__()
+
+
+class Dict_Structure(Dict_Term):
+
+  def __init__(self, term):
+    self.functor = term[0]
+    self.args = tuple(term[1:])
+    super().__init__()
+
+
+class Dict_Var(Dict_Term):
+
+  def __init__(self):
+    self.unification_chain_next = None
+    super().__init__()
+
+
+def bytes_per_object(make: Callable[[], object], n: int = 100_000) -> float:
+  """ The average number of bytes allocated by make( ), including whatever the new object refers to. """
+  tracemalloc.start( )
+  start = tracemalloc.take_snapshot( )
+  objects = [make( ) for _ in range(n)]
+  end = tracemalloc.take_snapshot( )
+  tracemalloc.stop( )
+  total = sum(stat.size_diff for stat in end.compare_to(start, 'filename'))
+  # Don't count the list that holds the objects.
+  total -= objects.__sizeof__( )
+  return total / n
+
+
+if __name__ == '__main__':
+  (X, Y, Z) = (Var( ), Var( ), Var( ))
+  rows = [('Var', Dict_Var, Var),
+          ('PyValue', Dict_PyValue, PyValue),
+          ('Structure (3 args)', lambda: Dict_Structure(('f', X, Y, Z)), lambda: Structure(('f', X, Y, Z))),
+          ]
+  print(f'{"":20} {"before":>8} {"after":>8}  (bytes per object)')
+  for (name, before, after) in rows:
+    print(f'{name:20} {bytes_per_object(before):8.1f} {bytes_per_object(after):8.1f}')
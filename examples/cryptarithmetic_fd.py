@@ -0,0 +1,46 @@
+from timeit import default_timer as timer
+from typing import Dict, List
+
+from pylog.control_structures import solutions
+from pylog.logic_variables import all_different, FDVar, label, not_equal, sum_equals
+
+
+def add_weights(word: str, sign: int, weights: Dict[str, int]):
+  """ Add sign * (the place value of each letter in word) to the weight of that letter. """
+  for (place, letter) in enumerate(reversed(word)):
+    weights[letter] += sign * 10**place
+
+
+def solve_crypto(t1: str, t2: str, sum: str):
+  """
+  The same puzzles as in cryptarithmetic.py, stated declaratively. Each letter is an FDVar with domain 0-9.
+  The letters are all different; the leading letters are not 0; and t1 + t2 - sum == 0.
+  The constraints prune the domains; label( ) searches what remains.
+  """
+  Letters = {letter: FDVar(range(10)) for letter in sorted(set(t1 + t2 + sum))}
+  weights = dict.fromkeys(Letters, 0)
+  for (word, sign) in [(t1, 1), (t2, 1), (sum, -1)]:
+    add_weights(word, sign, weights)
+  Vars: List[FDVar] = list(Letters.values())
+
+  def puzzle():
+    for _ in all_different(Vars):
+      for _ in not_equal(Letters[t1[0]], 0):
+        for _ in not_equal(Letters[t2[0]], 0):
+          for _ in not_equal(Letters[sum[0]], 0):
+            for _ in sum_equals(Vars, 0, weights.values()):
+              yield from label(Vars)
+
+  for values in solutions(puzzle, Vars):
+    digits = dict(zip(Letters, values))
+    (n1, n2, n_sum) = (''.join(str(digits[letter]) for letter in word) for word in [t1, t2, sum])
+    width = len(n_sum) + 2
+    print(f'\n{n1:>{width}}\n+ {n2:>{width-2}}\n{"-"*width}\n{n_sum:>{width}}')
+
+
+if __name__ == '__main__':
+  for (t1, t2, sum) in [('SEND', 'MORE', 'MONEY'), ('BASE', 'BALL', 'GAMES'), ('SATURN', 'URANUS', 'PLANETS')]:
+    start = timer()
+    print(f'\n{t1} + {t2} = {sum}')
+    solve_crypto(t1, t2, sum)
+    print(f'time: {round(timer() - start, 3)} sec')
@@ -1,8 +1,11 @@
 from math import log10
-from random import choice
+from random import Random
 from timeit import default_timer as timer
 from typing import Dict
 
+from pylog.control_structures import luby, restarts
+from pylog.logic_variables import trail
+
 
 class Placement(Dict):
   """
@@ -53,43 +56,36 @@ def new_placement_val(next_row, col, r, c, avail):
          (None, avail - {col, col+diff, col-diff})
 
 
-# Timing and counting
-limit = 0
-start = 0
-total_time_start = 0
-
-
 def place_n_queens(board_size: int):
   """
   The main function.
   
-  Generate and display solutions to the n-queens problem.
+  Generate and display solutions to the n-queens problem. Each (randomized) run is restarted when it
+  runs out of steps. The numbers of steps allowed follow the Luby sequence. Once a run finds a
+  solution, it continues without restarts.
   """
-  global limit, start, total_time_start
   starts = 0
-  total_time_start = timer( )
-  i = 0
-  while True:
-    i += 1
-    limit = i/4
+  start = total_time_start = timer( )
+
+  def new_run(rng: Random):
+    nonlocal starts, start
     starts += 1
-    start = timer()
-    placement = Placement(board_size)
-    solutionNbr = 0
-    for solution in place_remaining_queens(placement):
-      solutionNbr += 1
-      display_solution(board_size, solution, solutionNbr, start, starts, total_time_start)
-      inp = input('\nMore? (y, or n)? > ').lower( )
-      if inp != 'y':
-        return
-      starts = 1
-      total_time_start = start = timer()
-      i = 1
-
-
-def place_remaining_queens(placement: Placement):
+    start = timer( )
+    return place_remaining_queens(Placement(board_size), rng)
+
+  for (solutionNbr, solution) in enumerate(restarts(new_run, luby(2*board_size)), start=1):
+    display_solution(board_size, solution, solutionNbr, start, starts, total_time_start)
+    inp = input('\nMore? (y, or n)? > ').lower( )
+    if inp != 'y':
+      return
+    starts = 1
+    total_time_start = start = timer()
+
+
+def place_remaining_queens(placement: Placement, rng: Random):
   """
   Find a safe spot for the next queen and either quit if it's the last unfilled row or call this recursively.
+  Each col tried is an inference step.
   """
   uninstantiated_rows = placement.uninstantiated_rows()
   # Select the row with the fewest available possibilities as the next_row to be instantiated.
@@ -97,11 +93,10 @@ def place_remaining_queens(placement: Placement):
   avail_size = len(placement.values_available_for(most_constrained_row))
   most_constrained_rows = [k for k in uninstantiated_rows if len(placement.values_available_for(k)) == avail_size]
   # Pick a random most_constrained_row as the next one to instantiate.
-  next_row = choice(most_constrained_rows)
+  next_row = rng.choice(most_constrained_rows)
   for col in placement.values_available_for(next_row):
-    # Quit and restart if we've taken too long.
-    if timer( ) - start > limit:
-      return
+    # Counts against the run's budget. restarts( ) aborts the run when it runs out.
+    trail.step( )
     # Build the next placement.
     next_placement = Placement(placement.board_size)
     for (r, (c, avail)) in placement.items( ):
@@ -119,7 +114,7 @@ def place_remaining_queens(placement: Placement):
     # More queens to place.
     else:
       # Find columns for the remaining queens.
-      yield from place_remaining_queens(next_placement)
+      yield from place_remaining_queens(next_placement, rng)
       
       
 #############  Display functions  #############
@@ -2,7 +2,9 @@ from functools import reduce
 from typing import Iterator, List, Tuple, Union
 
 # from control_structures import forall
-from pylog.logic_variables import PyValue, Term, unify
+from pylog.control_structures import depth_counted, iterative_deepening, solutions, tabled
+from pylog.fact_table import FactTable
+from pylog.logic_variables import PyValue, unify
 
 
 lines = {
@@ -11,6 +13,11 @@ lines = {
   "Keihan": ["Ishiyamadera", "Zeze", "Hamaotsu", "Ano", "Sakamoto"]
 }
 
+# (line, station, position) facts: station is at position (0-based) on line.
+# Looking up the lines through a station uses the FactTable's index rather than scanning all the lines.
+stops = FactTable(3, ((line, station, position) for (line, stations) in lines.items()
+                                                 for (position, station) in enumerate(stations)))
+
 
 def best_route(Start: PyValue, End: PyValue):
   """
@@ -20,34 +27,26 @@ def best_route(Start: PyValue, End: PyValue):
 
   The best route uses the fewest lines, and of routes using the same number of lines, the fewest total Dist values.
   """
-  # Look for routes that use the fewest lines.
-  for i in range(1, len(lines)+1):
-    # i is the number of lines used.
-    # The middle sequence is the intermediate lines and stations.
-    # One line involves one intermediate element, the line used.
-    # Two lines involves 3 intermediate elements, the two lines used and the transfer station.
-    # Etc.
-    # The "+1" above allows i to take on the value len(lines), in which case we are using all the lines.
-    intermediate = (PyValue() for _ in range(2*i-1))
-    legs = [Start, *intermediate, End]
-    # If route(*legs) succeeds, route will instantiate legs to
-    #         [Station, (Line, int), Station, (Line, int), ... , Station]
-    # Once legs is instantiated, must extract the py_values so that the collection
-    # of routes remains instantiated after the list comprehension terminates.
-    route_options = [ [elt.get_py_value() for elt in legs] for _ in route(*legs) ]
-    # Once we find an i so that there is at least one route from Start to End using i lines,
-    # find the best of them and quit--by using return at the bottom.
-    # No point in looking for routes that use more lines.
-    if route_options:
-      routes_with_totals: Iterator[Tuple[List[str], int]] = map(sum_distances, route_options)
-      best_option: Tuple[List[str], int] = min(routes_with_totals, key=lambda routeDist: routeDist[1])
-      yield best_option
-      # return prevents backtracking, i.e., looking for longer routes.
-      # Has an effect similar to a cut (!) at the end of a clause in Prolog.
-      # break would work as well since it jumps out of the for-loop and returns.
-      return
-
-
+  # Look for routes that use the fewest lines. Each line used is one (nested) call of trip. So
+  # iterative deepening looks for routes using 1 line, then 2 lines, etc., up to all the lines.
+  # shallowest=True stops it once it has found some routes: there is no point in looking for routes
+  # that use more lines. Has an effect similar to a cut (!) in Prolog.
+  Route = PyValue( )
+  # If trip succeeds, it will instantiate Route to
+  #         (Station, (Line, int), Station, (Line, int), ... , Station)
+  # Must extract the py_values so that the collection of routes remains instantiated after the search
+  # terminates. solutions( ) does that.
+  route_options = [list(route_option) for route_option in
+                   solutions(iterative_deepening(lambda: trip(Start, End, Route), len(lines), shallowest=True),
+                             Route)]
+  if route_options:
+    routes_with_totals: Iterator[Tuple[List[str], int]] = map(sum_distances, route_options)
+    best_option: Tuple[List[str], int] = min(routes_with_totals, key=lambda routeDist: routeDist[1])
+    yield best_option
+
+
+# best_route asks for the same connections again for each number of lines. Tabling answers them from memory.
+@tabled(depends_on=[stops])
 def connected(S1: PyValue, Line_Dist: PyValue, S2: PyValue):
   # S1: Union[PyValue, Var], Line_Dist: Var, S2: Union[PyValue, Var
   """
@@ -56,53 +55,38 @@ def connected(S1: PyValue, Line_Dist: PyValue, S2: PyValue):
   Line_Dist will be unified with (line, count_of_stations)
   """
   # print(f'-> connected({S1}, {Line_Dist}, {S2})?')
-  Line = PyValue()
-  # Can use either forall or nested for _ in has_station's
-  # for _ in forall([lambda: has_station(Line, S1),
-  #                  lambda: has_station(Line, S2)]):
-  for _ in has_station(Line, S1):
-    for _ in has_station(Line, S2):
+  (Line, Pos1, Pos2) = (PyValue(), PyValue(), PyValue())
+  # Can use either forall or nested for _ in stops's
+  # for _ in forall([lambda: stops(Line, S1, Pos1),
+  #                  lambda: stops(Line, S2, Pos2)]):
+  for _ in stops(Line, S1, Pos1):
+    for _ in stops(Line, S2, Pos2):
       # Ensure that S1 != S2
       if S1 != S2:
-        line = Line.get_py_value()
-        stations = lines[line]
-        pos1 = stations.index(S1.get_py_value())
-        pos2 = stations.index(S2.get_py_value())
-        yield from unify(Line_Dist, (line, abs(pos1 - pos2)))
+        yield from unify(Line_Dist, (Line.get_py_value(), abs(Pos1.get_py_value() - Pos2.get_py_value())))
   # print(f'XX connected({S1}, {Line_Dist}, {S2})?')
 
 
 def has_station(L: PyValue, S: PyValue):
   # print(f'-> has_station({L}, {S})?')
-  for line in lines:
-    # If L is instantiated, find out whether it is line before looking at all the stations.
-    for _ in unify(L, line):
-      for station in lines[line]:
-        for _ in unify(S, station):
-          # print(f'<- has_station({L}, {S})')
-          yield
+  yield from stops(L, S, PyValue())
   # print(f'XX has_station({L}, {S})')
 
 
-def route(*legs: List[Term]):
+@depth_counted
+def trip(S1: PyValue, S2: PyValue, Route: PyValue):
   """
-  Can we get from the first station to the last? If so, which lines and
-  which intermediate stations should we use?
-  :param legs: a sequence of: station, line, station, line, ... station.
-  :return: Find a route and instantiate the intermediate PyValues.
+  Can we get from S1 to S2? If so, which lines and which intermediate stations should we use?
+  Route is unified with a tuple: (S1, (Line, Dist), Station, (Line, Dist), ..., S2).
   """
-  # print(f'-> route({[str(leg) for leg in legs]})?')
-  if len(legs) == 1:
-    # We have arrived at our destination. succeed
-    # print(f'<- route({[str(leg) for leg in legs]}?')
-    yield
-
-  # len(legs) should never be 0 or 2.
-  elif len(legs) >= 3:
-    # Take the next leg.
-    for _ in connected(*legs[:3]):
-      # Drop the first two elements, i.e., [Station, Line], and recurse.
-      yield from route(*legs[2:])
+  (Line_Dist, Station) = (PyValue( ), PyValue( ))
+  for _ in connected(S1, Line_Dist, Station):
+    if Station == S2:
+      yield from unify(Route, (S1.get_py_value( ), Line_Dist.get_py_value( ), S2.get_py_value( )))
+    else:
+      Rest = PyValue( )
+      for _ in trip(Station, S2, Rest):
+        yield from unify(Route, (S1.get_py_value( ), Line_Dist.get_py_value( ), *Rest.get_py_value( )))
 
 
 def sum_distances(legs: List[Union[str, Tuple[str, int]]]) -> Tuple[List[str], int]:
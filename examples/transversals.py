@@ -1,7 +1,7 @@
 from inspect import isgeneratorfunction, signature
 from typing import Generator, List, Optional, Set, Tuple
 
-from pylog.control_structures import fails, Trace
+from pylog.control_structures import CallCache, fails, Trace
 from pylog.logic_variables import PyValue, Var
 from pylog.sequence_options.sequences import PyList, PySet, PyTuple
 from pylog.sequence_options.super_sequence import member
@@ -151,6 +151,10 @@ def uninstan_indices_lv(tnvsl):
                if not tnvsl[indx].is_instantiated()]
 
 
+# The outcomes of the (ground) checks that a value hasn't been used.
+used_value_checks = CallCache(max_size=1000)
+
+
 @Trace
 def tnvsl_dfs_gen_lv(sets, tnvsl):
     var_indxs = uninstan_indices_lv(tnvsl)
@@ -163,12 +167,13 @@ def tnvsl_dfs_gen_lv(sets, tnvsl):
 
         nxt_indx = min(var_indxs,
                        key=lambda indx: len(sets[indx]))
-        used_values = PyList([tnvsl[i]
+        # The values themselves, not the Vars bound to them: a ground PyList is cached by its hash.
+        used_values = PyList([tnvsl[i].unification_chain_end()
                               for i in range(len(tnvsl))
                               if i not in var_indxs])
         T_Var = tnvsl[nxt_indx]
         for _ in member(T_Var, sets[nxt_indx]):
-            for _ in fails(member)(T_Var, used_values):
+            for _ in fails(member, used_value_checks)(T_Var, used_values):
                 new_sets = [set.discard(T_Var)
                             for set in sets]
                 yield from tnvsl_dfs_gen_lv(new_sets,
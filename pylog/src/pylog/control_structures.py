@@ -1,8 +1,22 @@
 # from inspect import getmembers
+import asyncio
+import pickle
+from collections import deque, OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import wraps
 from inspect import isgeneratorfunction, signature
-from typing import Generator
+from itertools import islice
+from math import inf
+from multiprocessing import Manager
+from queue import Empty, Queue
+from random import Random
+from threading import Event, Lock
+from time import perf_counter, sleep
+from typing import Any, Callable, Deque, Dict, Generator, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from weakref import WeakSet
 
-from .logic_variables import PyValue, Var, euc, unify, unify_pairs
+from .logic_variables import (copy_terms, euc, PyValue, snapshot_py_values, Structure, Term, trail, unify,
+                              unify_pairs, unify_sequences, Var, variant_key)
 
 
 class Bool_Yield_Wrapper:
@@ -48,15 +62,39 @@ class Bool_Yield_Wrapper:
           while gen.has_more():
               <do something>
 
-  The body of the while-loop will repeat each time the generator succeeds.
+  The body of the while-loop will repeat each time the generator succeeds. Leaving the with-block
+  closes the generator and undoes its bindings.
+
+  A Bool_Yield_Wrapper is also an asynchronous iterator, for use in asyncio code:
+
+      async with append(Xs, Ys, Zs) as gen:
+          async for _ in gen:
+              <do something>
+
+  Then the generator runs in a thread of its own, on a trail of its own, and it gives other
+  searches and the event loop a turn every async_steps inference steps. (See __anext__.)
   """
+
+  # In async mode, the number of inference steps between turns.
+  async_steps = 1000
+
   def __init__(self, gen):
     self.done = False
     self.gen = gen
     self.name = gen.__name__
+    # The bindings made by gen are those recorded on the trail after mark, which is taken when gen is
+    # first used: by the with-statement or the first __next__. (Bindings made before then aren't gen's.)
+    self.mark: Optional[int] = None
+    # In async mode, the thread gen runs in. (So gen records its bindings on that thread's trail.)
+    self.executor: Optional[ThreadPoolExecutor] = None
+    # Set (from the event loop's thread) to make the search stop at its next pause.
+    self.stopping = False
+    self.closed = False
 
   # __enter__ and __exit__ are required for "with"-statements
   def __enter__(self):
+    if self.mark is None:
+      self.mark = trail.mark( )
     return self
 
   def __exit__(self, type, value, traceback):
@@ -71,13 +109,115 @@ class Bool_Yield_Wrapper:
     :param traceback: of Exception, if any; otherwise None.
     :return: Whether Exception has been handeled or should be re-raised.
     """
-    pass
+    self.close( )
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, type, value, traceback):
+    await self.aclose( )
+
+  def __aiter__(self):
+    return self
+
+  async def __anext__(self):
+    """
+    Runs the generator to its next success in its own thread, so that the event loop is not blocked.
+    Only one search (i.e., async-mode Bool_Yield_Wrapper) runs at a time: the one holding search_baton.
+    Since each runs in a thread of its own, it records its bindings on that thread's trail. Every
+    async_steps inference steps, it hands the baton (and the GIL) on.
+
+    Code outside the searches, e.g., in the body of an async for-loop, may look at the Terms they bind.
+    Any bindings of its own are recorded on its own thread's trail.
+    """
+    if self.executor is None:
+      # A single thread: the generator can't run in two at once.
+      self.executor = ThreadPoolExecutor(max_workers=1)
+      trail.enter_concurrent( )
+    if not await asyncio.get_running_loop( ).run_in_executor(self.executor, self.async_step):
+      raise StopAsyncIteration
+
+  def async_step(self) -> bool:
+    self.take_turn( )
+    try:
+      return self.__next__( )
+    except SearchStopped:
+      self.done = True
+      return False
+    finally:
+      self.end_turn( )
+
+  def take_turn(self):
+    """ In async mode, wait for the baton. (Runs in the generator's thread, i.e., with its trail.) """
+    search_baton.acquire( )
+    (trail.checkpoint_at, trail.checkpoint) = (trail.inferences + self.async_steps, self.pause)
+
+  def end_turn(self):
+    search_baton.release( )
+
+  def pause(self):
+    """
+    The trail's checkpoint in async mode: let another search, or the event loop, have a turn.
+    If the search has been told to stop, unwind it (from its own thread) with SearchStopped.
+    """
+    self.end_turn( )
+    sleep(0)
+    self.take_turn( )
+    if self.stopping:
+      raise SearchStopped( )
+
+  def close(self):
+    """
+    Close the generator and undo its bindings. In async mode, that's done in the generator's thread
+    once the search has stopped running, and close( ) doesn't wait for it. (aclose( ) does.)
+    """
+    if self.closed:
+      return
+    (self.done, self.closed) = (True, True)
+    if self.executor is None:
+      self.gen.close( )
+      if self.mark is not None:
+        trail.undo_to(self.mark)
+    else:
+      self.stopping = True
+      self.executor.submit(self.close_in_thread)
+      self.executor.shutdown(wait=False)
+
+  async def aclose(self):
+    """
+    Close the generator and undo its bindings, as close( ) does, but in async mode wait (without
+    blocking the event loop) until that has been done. A search that is running, e.g., when the task
+    running it is cancelled, stops at its next pause.
+    """
+    if self.closed or self.executor is None:
+      self.close( )
+      return
+    (self.done, self.closed, self.stopping) = (True, True, True)
+    try:
+      await asyncio.get_running_loop( ).run_in_executor(self.executor, self.close_in_thread)
+    finally:
+      self.executor.shutdown(wait=False)
+
+  def close_in_thread(self):
+    """ In async mode, close the generator in its own thread--after any step it was running. """
+    self.take_turn( )
+    # Closing the generator may run code that unifies. Don't pause (or stop) while doing that.
+    trail.checkpoint_at = inf
+    try:
+      self.gen.close( )
+      if self.mark is not None:
+        trail.undo_to(self.mark)
+    finally:
+      trail.exit_concurrent( )
+      self.end_turn( )
 
   def __iter__(self):
     return self
 
   def __next__(self):
     """ Can be called next(runnable_append) as well as runnable_append.has_more() """
+    if self.mark is None:
+      self.mark = trail.mark( )
     if self.done:
       return False
     else:
@@ -95,6 +235,14 @@ class Bool_Yield_Wrapper:
     return self.__next__( )
 
 
+# Held by the async-mode Bool_Yield_Wrapper whose search is running.
+search_baton = Lock( )
+
+
+class SearchStopped(Exception):
+  """ Raised (in its own thread) through an async-mode search that has been told to stop. """
+
+
 def bool_yield_wrapper(gen):
   """
   A decorator. Generates the Bool_Yield_Wrapper object. See is_even_3, below
@@ -107,6 +255,500 @@ def bool_yield_wrapper(gen):
   return wrapped_func
 
 
+class AnswerTable:
+  """ The answers found for one call variant of a @tabled predicate. """
+
+  def __init__(self):
+    # Copies of the args, one for each distinct answer, in the order found; and their variant keys.
+    self.answers: List[tuple] = []
+    self.answer_keys = set( )
+    # complete: all the answers have been found. evaluating: they are being looked for.
+    self.complete = False
+    self.evaluating = False
+    # While this table is evaluating: the position in evaluating_tables of the outermost table being
+    # evaluated whose (incomplete) answers this evaluation has used, directly or indirectly.
+    self.outermost_dependency = inf
+    # Whether a recursive call used this table's answers while it was evaluating.
+    self.used_while_evaluating = False
+
+  def add(self, answer: tuple):
+    key = variant_key(answer)
+    if key not in self.answer_keys:
+      self.answer_keys.add(key)
+      self.answers.append(answer)
+
+
+# The AnswerTables being evaluated, innermost last.
+evaluating_tables: List[AnswerTable] = []
+
+# The invalidate functions of all the @tabled predicates.
+all_table_invalidators: List[Callable[[], None]] = []
+
+# The CallCaches in use. (A CallCache that is no longer referenced elsewhere drops out.)
+all_call_caches: 'WeakSet[CallCache]' = WeakSet( )
+
+
+def invalidate_tables():
+  """ Discard the answer tables of all @tabled predicates and the outcomes in all CallCaches. """
+  for invalidate in all_table_invalidators:
+    invalidate( )
+  for cache in list(all_call_caches):
+    cache.invalidate( )
+
+
+def tabled(f=None, *, max_tables: int = 1000, depends_on: Iterable = ( )):
+  """
+  A decorator for predicates (generator functions) whose solutions depend only on their args. It may
+  be used as @tabled or, with options, as, e.g., @tabled(max_tables=100, depends_on=[stops]).
+
+  Calls are keyed by the variant of their (dereferenced) args. (See variant_key.) The first call of a
+  variant finds all its answers--snapshots (copies) of the args at each success, without duplicates--
+  and records them in an AnswerTable. That call and later calls of the same variant then unify the args
+  with the recorded answers in turn rather than search again.
+
+  A recursive call of a variant whose answers are still being found uses the answers found so far, and
+  the first call runs the predicate again until no new answers appear. So left-recursive predicates,
+  e.g., path(X, Z) :- path(X, Y), edge(Y, Z), terminate--provided they have finitely many answers.
+
+  At most max_tables variants are kept; the least recently used is discarded first. The tables are
+  discarded when the version of any of the depends_on FactTables changes, or when the decorated
+  function's invalidate( ) is called. invalidate_tables( ) discards the tables of all @tabled predicates.
+  """
+  if f is None:
+    return lambda f: tabled(f, max_tables=max_tables, depends_on=depends_on)
+
+  depends_on = tuple(depends_on)
+  tables: OrderedDict[tuple, AnswerTable] = OrderedDict( )
+  versions = [tuple(fact_table.version for fact_table in depends_on)]
+
+  @wraps(f)
+  def tabled_wrapper(*args):
+    current_versions = tuple(fact_table.version for fact_table in depends_on)
+    if current_versions != versions[0]:
+      tables.clear( )
+      versions[0] = current_versions
+    key = variant_key(args)
+    table = tables.get(key)
+    if table is None:
+      table = tables[key] = AnswerTable( )
+      if len(tables) > max_tables:
+        evict(tables)
+    else:
+      tables.move_to_end(key)
+    if table.evaluating:
+      # A recursive call of a variant being evaluated. The evaluations since then depend on its answers.
+      table.used_while_evaluating = True
+      position = evaluating_tables.index(table)
+      for evaluating_table in evaluating_tables[position+1:]:
+        evaluating_table.outermost_dependency = min(evaluating_table.outermost_dependency, position)
+    elif not table.complete:
+      evaluate(f, args, table)
+      if not table.complete and tables.get(key) is table:
+        # It used answers of a table that was (and is) still incomplete. So its answers may be partial.
+        # Don't keep them.
+        del tables[key]
+    return replay(table, args)
+
+  def invalidate():
+    tables.clear( )
+
+  tabled_wrapper.invalidate = invalidate
+  all_table_invalidators.append(invalidate)
+  return tabled_wrapper
+
+
+def evaluate(f, args: tuple, table: AnswerTable):
+  """ Find the answers of f(*args), running it until no new ones appear. """
+  position = len(evaluating_tables)
+  table.evaluating = True
+  evaluating_tables.append(table)
+  try:
+    while True:
+      (table.outermost_dependency, table.used_while_evaluating) = (inf, False)
+      answer_count = len(table.answers)
+      for _ in f(*args):
+        table.add(copy_terms(args))
+      # If no recursive call used the answers, or there were no new ones, running again would find no more.
+      if not table.used_while_evaluating or len(table.answers) == answer_count:
+        break
+  finally:
+    evaluating_tables.pop( )
+    table.evaluating = False
+  # Complete unless it used the answers of an enclosing evaluation, which may find more.
+  table.complete = table.outermost_dependency >= position
+  if not table.complete:
+    # Through this one, the enclosing evaluation depends on that one as well.
+    enclosing = evaluating_tables[-1]
+    enclosing.outermost_dependency = min(enclosing.outermost_dependency, table.outermost_dependency)
+
+
+def evict(tables: OrderedDict):
+  """ Discard the least recently used table that is not being evaluated. """
+  for (key, table) in tables.items( ):
+    if not table.evaluating:
+      del tables[key]
+      return
+
+
+def replay(table: AnswerTable, args: tuple):
+  """ Unify args with each answer in table, including those added while this is running. """
+  i = 0
+  while i < len(table.answers):
+    answer = table.answers[i]
+    i += 1
+    yield from unify_sequences(args, copy_terms(answer))
+
+
+class BudgetExhausted(Exception):
+  """ Raised from within a goal's unifications when the Budget it is running under runs out. """
+
+  def __init__(self, budget: 'Budget'):
+    super().__init__( )
+    self.budget = budget
+
+
+class Budget:
+  """
+  A limit on the inference steps (see Trail.inferences) and/or the seconds a goal may take.
+
+      budget = Budget(steps=100000, seconds=0.5)
+      for _ in budget.run(goal): ...
+
+  Only the steps taken and the time spent while the goal itself is running count. When the budget runs
+  out, the goal is aborted: its generators are unwound by a BudgetExhausted exception, its bindings are
+  undone, and run( ) stops. Then budget.exhausted is True. The trail counts the steps; the clock is
+  looked at only every check_every steps. Budgets may be nested.
+  """
+
+  def __init__(self, steps: Optional[int] = None, seconds: Optional[float] = None, check_every: int = 1000):
+    self.steps = steps
+    self.seconds = seconds
+    self.check_every = check_every
+    self.exhausted = False
+    (self.steps_used, self.seconds_used) = (0, 0.0)
+    # The clock is looked at next when steps_used reaches this.
+    self.clock_check_at = check_every
+    # While the goal is running: the trail's checkpoint settings this Budget replaced, and when it resumed.
+    self.saved_checkpoint: Optional[Tuple[float, Callable]] = None
+    (self.resumed_at_step, self.resumed_at_time) = (0, 0.0)
+
+  def run(self, goal: Union[Iterable, Callable[[], Iterable]]):
+    """ Run goal under this budget. Yields the values goal yields. """
+    mark = trail.mark( )
+    gen = iter(goal( ) if callable(goal) else goal)
+    while True:
+      self.resume( )
+      try:
+        value = next(gen, exhausted)
+      except BudgetExhausted as budget_exhausted:
+        if budget_exhausted.budget is not self:
+          raise
+        self.exhausted = True
+        trail.undo_to(mark)
+        return
+      finally:
+        self.suspend( )
+      if value is exhausted:
+        return
+      yield value
+
+  def resume(self):
+    self.saved_checkpoint = (trail.checkpoint_at, trail.checkpoint)
+    (self.resumed_at_step, self.resumed_at_time) = (trail.inferences, perf_counter( ))
+    self.set_checkpoint( )
+
+  def suspend(self):
+    self.steps_used += trail.inferences - self.resumed_at_step
+    self.seconds_used += perf_counter( ) - self.resumed_at_time
+    (trail.checkpoint_at, trail.checkpoint) = self.saved_checkpoint
+
+  def set_checkpoint(self):
+    """
+    Have the trail call check( ) when the steps run out, when it's time to look at the clock, or when
+    the checkpoint this Budget replaced is due--whichever comes first.
+    """
+    next_check = self.saved_checkpoint[0]
+    if self.steps is not None:
+      next_check = min(next_check, self.resumed_at_step + self.steps - self.steps_used)
+    if self.seconds is not None:
+      next_check = min(next_check, self.resumed_at_step + self.clock_check_at - self.steps_used)
+    (trail.checkpoint_at, trail.checkpoint) = (next_check, self.check)
+
+  def check(self):
+    (saved_checkpoint_at, saved_checkpoint) = self.saved_checkpoint
+    if trail.inferences >= saved_checkpoint_at:
+      # An enclosing Budget, e.g., may raise BudgetExhausted here.
+      saved_checkpoint( )
+      self.saved_checkpoint = (trail.checkpoint_at, trail.checkpoint)
+    steps_used = self.steps_used + trail.inferences - self.resumed_at_step
+    if self.steps is not None and steps_used >= self.steps:
+      raise BudgetExhausted(self)
+    if self.seconds is not None and steps_used >= self.clock_check_at:
+      if self.seconds_used + perf_counter( ) - self.resumed_at_time >= self.seconds:
+        raise BudgetExhausted(self)
+      self.clock_check_at = steps_used + self.check_every
+    self.set_checkpoint( )
+
+
+def luby(unit: int = 100) -> Iterator[int]:
+  """ unit times the Luby sequence: 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ... """
+  i = 1
+  while True:
+    # The ith term is 2**(k-1) if i == 2**k - 1. Otherwise, with 2**(k-1) <= i < 2**k - 1, it's the
+    # (i - 2**(k-1) + 1)th term.
+    j = i
+    while j != 2**j.bit_length( ) - 1:
+      j -= 2**(j.bit_length( ) - 1) - 1
+    yield unit * 2**(j.bit_length( ) - 1)
+    i += 1
+
+
+def geometric(unit: int = 100, factor: float = 2) -> Iterator[int]:
+  """ unit, unit*factor, unit*factor**2, ... (rounded) """
+  steps = unit
+  while True:
+    yield round(steps)
+    steps *= factor
+
+
+def restarts(goal_factory: Callable[[Random], Iterable], schedule: Iterable[int],
+             seconds: Optional[float] = None, seed: Optional[int] = None):
+  """
+  Randomized restarts. Runs goal_factory(rng) under a Budget of the next number of steps in schedule
+  (e.g., luby( ) or geometric( )) until a run either succeeds or searches all of its search space. rng
+  is a random.Random, which the goal should use to make its choices, as label(Vars, rng) does. So
+  each run looks at a different part of the search space.
+
+  Once a run succeeds, it is no longer limited by steps: it goes on to produce all its solutions.
+  Yields the values the goal yields. seconds limits the time of all the runs together. seed seeds rng.
+  """
+  rng = Random(seed)
+  seconds_left = seconds
+  for steps in schedule:
+    budget = Budget(steps=steps, seconds=seconds_left)
+    for value in budget.run(goal_factory(rng)):
+      budget.steps = None
+      yield value
+    if not budget.exhausted:
+      return
+    if seconds_left is not None:
+      seconds_left -= budget.seconds_used
+      if seconds_left <= 0:
+        return
+
+
+class DepthBound:
+  """
+  The nesting depth of the calls of @depth_counted predicates now running, and the limit on it set by
+  depth_bounded( ). A call that would exceed the limit fails instead, and sets cut_off.
+  """
+
+  def __init__(self):
+    self.depth = 0
+    self.limit = inf
+    # Whether a call has failed because of the limit, i.e., whether a deeper search might find more.
+    self.cut_off = False
+
+
+# The DepthBound used by @depth_counted and depth_bounded( ).
+depth_bound = DepthBound( )
+
+
+def depth_counted(f):
+  """
+  A decorator for (recursive) predicates. Each call of the decorated predicate is one level deeper
+  than the @depth_counted call it is (directly or indirectly) made from. The depth is kept in
+  depth_bound as the generators are resumed and suspended. When no depth_bounded( ) search is running,
+  a call costs one extra function call.
+  """
+
+  @wraps(f)
+  def depth_counted_wrapper(*args, **kwargs):
+    if depth_bound.limit == inf:
+      return f(*args, **kwargs)
+    return run_depth_counted(f(*args, **kwargs))
+
+  return depth_counted_wrapper
+
+
+def run_depth_counted(gen: Iterator):
+  # The depth of the caller. (It's running when this generator is first resumed.)
+  depth = depth_bound.depth
+  if depth >= depth_bound.limit:
+    depth_bound.cut_off = True
+    close(gen)
+    return
+  try:
+    while True:
+      depth_bound.depth = depth + 1
+      try:
+        value = next(gen, exhausted)
+      finally:
+        depth_bound.depth = depth
+      if value is exhausted:
+        return
+      yield value
+  finally:
+    close(gen)
+
+
+def depth_bounded(goal: Union[Iterable, Callable[[], Iterable]], d: int):
+  """
+  Run goal, failing the calls of @depth_counted predicates that are nested more than d deep (counting
+  from here). The bound applies only while goal is running, not while the caller has control.
+  Yields the values goal yields.
+  """
+  limit = depth_bound.depth + d
+  gen = None
+  try:
+    while True:
+      saved_limit = depth_bound.limit
+      depth_bound.limit = min(limit, saved_limit)
+      try:
+        if gen is None:
+          # Made within the bound, so that a @depth_counted goal counts as the first level.
+          gen = iter(goal( ) if callable(goal) else goal)
+        value = next(gen, exhausted)
+      finally:
+        depth_bound.limit = saved_limit
+      if value is exhausted:
+        return
+      yield value
+  finally:
+    close(gen)
+
+
+def iterative_deepening(goal: Callable[[], Iterable], max_d: float = inf,
+                        template: Optional[Union[Term, Sequence[Any]]] = None, shallowest: bool = False):
+  """
+  Iterative deepening: runs depth_bounded(goal( ), d) for d = 1, 2, ..., max_d. So solutions are found
+  in order of depth--e.g., shortest paths first--without depth-first search running away down an
+  infinite (or very deep) branch. Stops when a search is not cut off by its bound, since a deeper one
+  would find nothing more.
+
+  A search with bound d finds again the solutions found with smaller bounds. If template is given,
+  the solutions already found are carried forward, and only the new ones are yielded. (The py_values of
+  template must be hashable.) If shallowest, stops after the first d at which goal succeeds.
+  """
+  terms = None if template is None else ((template, ) if isinstance(template, Term) else tuple(template))
+  found = set( )
+  d = 1
+  while d <= max_d:
+    (saved_cut_off, cut_off, succeeded) = (depth_bound.cut_off, False, False)
+    gen = depth_bounded(goal, d)
+    try:
+      while True:
+        depth_bound.cut_off = False
+        try:
+          value = next(gen, exhausted)
+        finally:
+          cut_off = cut_off or depth_bound.cut_off
+          depth_bound.cut_off = saved_cut_off
+        if value is exhausted:
+          break
+        succeeded = True
+        if terms is not None:
+          key = variant_key(terms)
+          if key in found:
+            continue
+          found.add(key)
+        yield value
+    finally:
+      close(gen)
+    if not cut_off or shallowest and succeeded:
+      return
+    d += 1
+
+
+class CallCache:
+  """
+  Remembers whether ground calls succeed, for fails( ) and would_succeed( ). E.g.,
+
+      used_value_checks = CallCache(max_size=1000)
+      for _ in fails(member, used_value_checks)(T_Var, used_values): ...
+
+  A call is cached if each of its args, once dereferenced, is an instantiated PyValue (or a plain Python
+  value) or a ground Structure, i.e., one built from constants, which knows its hash. Its outcome is keyed
+  by the function, the values, and the hashes of the Structures, which are compared when the key is found.
+  Other calls (and calls whose values aren't hashable) aren't cached. So a repeated check costs a hash
+  lookup, whatever the size of its args--provided the function's outcome depends only on its args.
+
+  At most max_size outcomes are kept; the least recently used is discarded first. A CallCache is also
+  the scope within which outcomes are kept: they are discarded when the version of any of the depends_on
+  FactTables changes, or when invalidate( ) (or invalidate_tables( )) is called.
+  """
+
+  def __init__(self, max_size: int = 10000, depends_on: Iterable = ( )):
+    self.max_size = max_size
+    self.depends_on = tuple(depends_on)
+    # Each key maps to the outcome and the Structures among the args.
+    self.outcomes: OrderedDict[tuple, Tuple[bool, tuple]] = OrderedDict( )
+    self.versions = self.current_versions( )
+    all_call_caches.add(self)
+
+  def current_versions(self) -> tuple:
+    return tuple(fact_table.version for fact_table in self.depends_on)
+
+  def invalidate(self):
+    self.outcomes.clear( )
+
+  @staticmethod
+  def call_key(terms: tuple) -> Optional[Tuple[tuple, tuple]]:
+    """
+    The key for terms (see above) and the Structures among them, made in constant time per term.
+    None if the call isn't cached.
+    """
+    (key, structures) = ([], [])
+    for T in terms:
+      if isinstance(T, Var):
+        T = T.unification_chain_end( )
+      if isinstance(T, PyValue):
+        if T._py_value is None:
+          return None
+        key.append(T._py_value)
+      elif isinstance(T, Structure):
+        if T._ground_hash is None:
+          return None
+        key.append((Structure, T._ground_hash))
+        structures.append(T)
+      elif isinstance(T, Var):
+        return None
+      else:
+        key.append(T)
+    return (tuple(key), tuple(structures))
+
+  def succeeds(self, f: Callable, args: tuple, kwargs: Dict[str, Any]) -> bool:
+    """ Whether f(*args, **kwargs) succeeds. Any bindings it makes are undone. """
+    call_key = self.call_key((*args, *kwargs.values( )))
+    key = None
+    if call_key is not None:
+      (key, structures) = ((f, tuple(kwargs), call_key[0]), call_key[1])
+      versions = self.current_versions( )
+      if versions != self.versions:
+        self.outcomes.clear( )
+        self.versions = versions
+      try:
+        entry = self.outcomes.get(key)
+      except TypeError:
+        # Unhashable values.
+        key = entry = None
+      # Equal hashes don't guarantee equal Structures.
+      if entry is not None and all(S is T or S == T for (S, T) in zip(entry[1], structures)):
+        self.outcomes.move_to_end(key)
+        return entry[0]
+    mark = trail.mark( )
+    gen = f(*args, **kwargs)
+    outcome = next(gen, exhausted) is not exhausted
+    close(gen)
+    trail.undo_to(mark)
+    if key is not None:
+      self.outcomes[key] = (outcome, structures)
+      self.outcomes.move_to_end(key)
+      if len(self.outcomes) > self.max_size:
+        self.outcomes.popitem(last=False)
+    return outcome
+
+
 def bool_to_sf(b: bool) -> Generator[None, None, None]:
   """ 
   Turns a boolean condition into a Generator, which succeeds/fails
@@ -116,13 +758,18 @@ def bool_to_sf(b: bool) -> Generator[None, None, None]:
     yield
 
 
-def fails(f):
+def fails(f, cache: Optional[CallCache] = None):
   """
   Applied to a function so that the resulting function succeeds iff the original fails.
   Note that it is applied to the function itself, not to a function call.
   Similar to a decorator but applied explicitly when used.
+  If cache (a CallCache) is given, the outcomes of ground calls are remembered there.
   """
   def fails_wrapper(*args, **kwargs):
+    if cache is not None:
+      if not cache.succeeds(f, args, kwargs):
+        yield
+      return
     for _ in f(*args, **kwargs):
       return  # Fail if f succeeds
     yield     # Succeed if f fails.
@@ -134,15 +781,105 @@ def forall(gens):
   """
   Succeeds if all generators in the gens list succeed. The elements in the gens list
   are embedded in lambda functions to avoid premature evaluation.
+
+  Equivalent to
+      for _ in gens[0]( ):
+        for _ in gens[1]( ):
+          ...
+            yield
+  but run from an explicit stack of iterators, so the number of gens is not limited by the recursion
+  limit, and moving from one gen to the next takes constant time.
+
+  A gen may be a Cut, which succeeds once. Backing up into it ends the conjunction: the gens before it
+  are closed and their bindings undone, as with Prolog's !. (See Cut.)
   """
-  if not gens:
+  n = len(gens)
+  if n == 0:
     # They have all succeeded.
     yield
-  else:
-    # Get gens[0] and evaluate the lambda expression to get a fresh iterator.
-    # If it succeeds, run the rest of the generators in the list.
-    for _ in gens[0]( ):
-      yield from forall(gens[1:])
+    return
+  mark = trail.mark( )
+  # running[i] is the iterator of gens[i]. Those of gens[:len(running)] have all succeeded.
+  running = [iter(gens[0]( ))]
+  while running:
+    if next(running[-1], exhausted) is exhausted:
+      # Back up to the previous gen.
+      running.pop( )
+      cut = gens[len(running)]
+      if isinstance(cut, Cut):
+        cut.fired = True
+        while running:
+          close(running.pop( ))
+        trail.undo_to(mark)
+    elif len(running) == n:
+      # They have all succeeded.
+      yield
+    else:
+      # Get the next gen and evaluate the lambda expression to get a fresh iterator.
+      running.append(iter(gens[len(running)]( )))
+
+
+# Returned by next( ) when an iterator has no more values.
+exhausted = object( )
+
+
+class Cut:
+  """
+  A scoped cut. Create one for each call of a predicate, and include it in the gens of forall:
+
+      def p(X):
+        cut = Cut( )
+        yield from cut.alternatives([lambda: forall([lambda: a(X), cut, lambda: b(X)]),
+                                     lambda: c(X)])
+
+  is like the Prolog clauses
+
+      p(X) :- a(X), !, b(X).
+      p(X) :- c(X).
+
+  The cut succeeds once. When the search backs up into it, the forall containing it ends, without
+  looking for more solutions of a(X). The cut has then fired, and cut.alternatives does not go on to c(X).
+  """
+
+  def __init__(self):
+    self.fired = False
+
+  def __call__(self):
+    return iter([None])
+
+  def alternatives(self, gens):
+    """ Like forany, but tries no more of the gens once this Cut has fired. """
+    for gen in gens:
+      if self.fired:
+        return
+      yield from gen( )
+
+
+def close(gen):
+  """ Close gen, if it is a generator. That closes the generators it is running as well. """
+  if hasattr(gen, 'close'):
+    gen.close( )
+
+
+def first_n(k: int, goal: Union[Iterable, Callable[[], Iterable]]):
+  """
+  Succeeds at most k times, once for each of the first k successes of goal. Then it closes goal
+  and undoes goal's bindings, whether it has run out of successes or it is abandoned (i.e., closed).
+  goal is a generator or, as in forall, a function of no arguments that returns one.
+  """
+  mark = trail.mark( )
+  gen = iter(goal( ) if callable(goal) else goal)
+  try:
+    for _ in islice(gen, k):
+      yield
+  finally:
+    close(gen)
+    trail.undo_to(mark)
+
+
+def once(goal: Union[Iterable, Callable[[], Iterable]]):
+  """ Succeeds once if goal succeeds. (See first_n.) """
+  yield from first_n(1, goal)
 
 
 def forany(gens):
@@ -160,19 +897,140 @@ def forany(gens):
     yield from gen( )
 
 
+def parallel_forany(alternatives: Sequence[Tuple], template: Union[Term, Sequence[Any]],
+                    ordered: bool = True, executor: Optional[Executor] = None):
+  """
+  An OR-parallel forany. Each alternative is a tuple (gen_function, *args), where gen_function is
+  a module-level generator function (so that it can be pickled). Each alternative runs in a worker
+  process, on a copy of its args--and of template--that is pickled along with the current bindings.
+
+  A worker sends a snapshot (again, a pickled copy) of template for each success of its alternative as
+  soon as it is found. For each snapshot, this generator unifies template with the snapshot and succeeds.
+  Bindings reach the caller only through template. The snapshots arrive in the order of the alternatives
+  if ordered--those of later alternatives wait until the earlier ones are done--otherwise as they are found.
+  So an alternative that never finishes still contributes its successes.
+
+  The alternatives run in executor if one is given; otherwise in a ProcessPoolExecutor with a worker
+  per core. When this generator finishes or is abandoned, the workers are told to stop at their next
+  success, and those not yet started are cancelled. The workers of its own executor are also terminated,
+  so that it doesn't wait for alternatives that are still running. The binding of template is undone.
+  """
+  template = (template, ) if isinstance(template, Term) else tuple(template)
+  mark = trail.mark( )
+  own_executor = executor is None
+  if own_executor:
+    executor = ProcessPoolExecutor( )
+  manager = Manager( )
+  (snapshots, stop) = (manager.Queue( ), manager.Event( ))
+  futures = [executor.submit(run_alternative, alternative, template, i, snapshots, stop)
+             for (i, alternative) in enumerate(alternatives)]
+  # If ordered, the snapshots of each alternative after the one whose turn it is wait in its buffer.
+  (buffers, done, turn) = ([deque( ) for _ in futures], set( ), 0)
+  try:
+    while (turn if ordered else len(done)) < len(futures):
+      try:
+        (i, snapshot) = snapshots.get(timeout=0.1)
+      except Empty:
+        # A worker that failed without saying it was done (e.g., one that was killed) raises here.
+        for future in futures:
+          if future.done( ) and not future.cancelled( ) and future.exception( ) is not None:
+            future.result( )
+        continue
+      if snapshot is None:
+        done.add(i)
+        # Raises the alternative's exception, if any.
+        futures[i].result( )
+      elif not ordered:
+        yield from unify_sequences(template, pickle.loads(snapshot))
+      else:
+        buffers[i].append(snapshot)
+      while ordered and turn < len(futures):
+        if buffers[turn]:
+          yield from unify_sequences(template, pickle.loads(buffers[turn].popleft( )))
+        elif turn in done:
+          turn += 1
+        else:
+          break
+  finally:
+    trail.undo_to(mark)
+    stop.set( )
+    for future in futures:
+      future.cancel( )
+    if own_executor:
+      processes = list((getattr(executor, '_processes', None) or { }).values( ))
+      executor.shutdown(wait=False, cancel_futures=True)
+      for process in processes:
+        process.terminate( )
+    manager.shutdown( )
+
+
+def run_alternative(alternative: Tuple, template: Tuple, i: int, snapshots: Queue, stop: Event):
+  """
+  Run in a parallel_forany worker: put (i, a pickled copy of template) on snapshots after each success of
+  alternative, the i-th, until stop is set, and then (i, None).
+  """
+  (gen_function, *args) = alternative
+  try:
+    for _ in gen_function(*args):
+      if stop.is_set( ):
+        break
+      snapshots.put((i, pickle.dumps(template)))
+  finally:
+    snapshots.put((i, None))
+
+
+def solutions(goal: Union[Iterable, Callable[[], Iterable]], template: Union[Term, Sequence[Any]],
+              limit: Optional[int] = None, offset: int = 0) -> Iterator[Any]:
+  """
+  Runs goal and yields, for each of its successes, the py_values of template as plain Python values:
+  a tuple if template is a sequence of Terms; a single py_value if it is a single Term. E.g.,
+
+      route_options = list(solutions(route(*legs), legs))
+
+  Skips the first offset successes and stops after limit solutions (if limit is not None). goal may
+  be a generator or, as in forall, a function of no arguments (e.g., a lambda) that returns one.
+  Since the solutions are snapshots, they remain valid after the bindings that produced them are undone.
+  When limit is reached, or solutions( ) itself is abandoned (i.e., closed), goal is closed and the
+  bindings it made are undone--so list(solutions(...)), paging, and stopping early leave no generator
+  frames or bindings behind.
+  """
+  single = isinstance(template, Term)
+  terms = (template, ) if single else tuple(template)
+  mark = trail.mark( )
+  gen = iter(goal( ) if callable(goal) else goal)
+  stop = None if limit is None else offset + limit
+  try:
+    for _ in islice(gen, offset, stop):
+      snapshot = snapshot_py_values(terms)
+      yield snapshot[0] if single else snapshot
+  finally:
+    close(gen)
+    trail.undo_to(mark)
+
+
 class Trace:
+  """
+  A decorator that prints each call, indented by its depth, while Trace.trace is True. Calls of decorated
+  predicates (generator functions) are also recorded by profiler, as @profiled ones are, when it is enabled.
+
+  While Trace.trace is False, nothing is formatted or printed, and the depth isn't kept: a call costs
+  one extra function call (as for @profiled). Use profiler, not printing, to see where a search's time goes.
+  """
   trace = True
 
   def __init__(self, f):
     self.param_names = [param.name for param in signature(f).parameters.values()]
     self.f = f
+    self.name = f.__qualname__
+    self.is_predicate = isgeneratorfunction(f)
     self.depth = 0
 
   def __call__(self, *args):
-    if Trace.trace:
-      print(self.trace_line(args))
+    if not Trace.trace:
+      return profiler.run(self.name, self.f(*args)) if self.is_predicate and profiler.enabled else self.f(*args)
+    print(self.trace_line(args))
     self.depth += 1
-    if isgeneratorfunction(self.f):
+    if self.is_predicate:
       return self.yield_from(*args)
     else:
       f_return = self.f(*args)
@@ -180,7 +1038,7 @@ class Trace:
       return f_return
 
   def yield_from(self, *args):
-    yield from self.f(*args)
+    yield from profiler.run(self.name, self.f(*args)) if profiler.enabled else self.f(*args)
     self.depth -= 1
 
   @staticmethod
@@ -201,6 +1059,131 @@ class Trace:
     return prefix + params + termination
 
 
+class Profiler:
+  """
+  Records what the predicates decorated with @profiled do, as in Prolog's box model:
+    call: the predicate is called;
+    exit: it succeeds;
+    redo: it is asked for another solution after succeeding;
+    fail: it has no (more) solutions.
+
+  For each predicate, stats holds the counts of these events, the wall time spent in it (including
+  the predicates it calls), and the number of inference steps (unifications) taken during that time.
+  The most recent events are kept in the events ring buffer as (event, predicate, depth) triples.
+  The time spent in each stack of predicates (excluding the predicates that stack calls) is kept
+  for flame graphs. (See collapsed_stacks.)
+
+  Nothing is recorded unless enabled, e.g., within "with profiler:". When not enabled, a @profiled
+  predicate costs one extra function call per call and nothing per solution.
+  """
+
+  # The columns of stats.
+  (CALL, EXIT, REDO, FAIL, SECONDS, INFERENCES) = range(6)
+
+  def __init__(self, ring_size: int = 10000):
+    self.enabled = False
+    self.ring_size = ring_size
+    self.reset( )
+
+  def __enter__(self):
+    self.enabled = True
+    return self
+
+  def __exit__(self, type, value, traceback):
+    self.enabled = False
+
+  def reset(self):
+    self.stats: Dict[str, List[Union[int, float]]] = {}
+    self.events: Deque[Tuple[str, str, int]] = deque(maxlen=self.ring_size)
+    # The stack of the predicates now running, as paths: 'outer;...;inner'. '' is the base.
+    self.stack: List[str] = ['']
+    self.child_paths: Dict[Tuple[str, str], str] = {}
+    self.stack_seconds: Dict[str, float] = {}
+    self.last_time = perf_counter( )
+
+  def collapsed_stacks(self) -> str:
+    """
+    The time spent in each stack of predicates, in the "collapsed stack" format read by flame graph
+    tools (e.g., flamegraph.pl and speedscope): one line per stack, 'outer;...;inner microseconds'.
+    """
+    return '\n'.join(f'{path} {round(seconds * 1e6)}' for (path, seconds) in self.stack_seconds.items( ) if path)
+
+  def report(self) -> str:
+    """ A table of the stats, the predicates taking the most time first. """
+    lines = [f'{"predicate":40} {"calls":>9} {"exits":>9} {"redos":>9} {"fails":>9} {"seconds":>9} {"inferences":>11}']
+    for (name, stats) in sorted(self.stats.items( ), key=lambda item: -item[1][Profiler.SECONDS]):
+      (calls, exits, redos, fails, seconds, inferences) = stats
+      lines.append(f'{name:40} {calls:9} {exits:9} {redos:9} {fails:9} {seconds:9.3f} {inferences:11}')
+    return '\n'.join(lines)
+
+  def run(self, name: str, gen: Iterator):
+    """ Run gen, the generator of a call of the predicate name, recording what it does. """
+    stats = self.stats.get(name)
+    if stats is None:
+      stats = self.stats[name] = [0, 0, 0, 0, 0.0, 0]
+    stats[Profiler.CALL] += 1
+    self.events.append(('call', name, len(self.stack) - 1))
+    try:
+      while True:
+        self.push(name)
+        (start, start_inferences) = (self.last_time, trail.inferences)
+        try:
+          next(gen)
+        except StopIteration:
+          stats[Profiler.FAIL] += 1
+          self.events.append(('fail', name, len(self.stack) - 2))
+          return
+        finally:
+          stats[Profiler.SECONDS] += self.pop( ) - start
+          stats[Profiler.INFERENCES] += trail.inferences - start_inferences
+        stats[Profiler.EXIT] += 1
+        self.events.append(('exit', name, len(self.stack) - 1))
+        yield
+        stats[Profiler.REDO] += 1
+        self.events.append(('redo', name, len(self.stack) - 1))
+    finally:
+      close(gen)
+
+  def push(self, name: str):
+    """ name starts (or resumes) running. Charge the time since the last push or pop to the current stack. """
+    now = perf_counter( )
+    path = self.stack[-1]
+    self.stack_seconds[path] = self.stack_seconds.get(path, 0.0) + now - self.last_time
+    child_path = self.child_paths.get((path, name))
+    if child_path is None:
+      child_path = self.child_paths[(path, name)] = f'{path};{name}' if path else name
+    self.stack.append(child_path)
+    self.last_time = now
+
+  def pop(self) -> float:
+    """ The current predicate stops (or suspends) running. Returns the time. """
+    now = perf_counter( )
+    path = self.stack.pop( )
+    self.stack_seconds[path] = self.stack_seconds.get(path, 0.0) + now - self.last_time
+    self.last_time = now
+    return now
+
+
+# The Profiler used by @profiled.
+profiler = Profiler( )
+
+
+def profiled(f):
+  """
+  A decorator for predicates (generator functions). Calls of the decorated predicate are recorded
+  by profiler when it is enabled.
+  """
+  name = f.__qualname__
+
+  @wraps(f)
+  def profiled_wrapper(*args, **kwargs):
+    if not profiler.enabled:
+      return f(*args, **kwargs)
+    return profiler.run(name, f(*args, **kwargs))
+
+  return profiled_wrapper
+
+
 def trace(x, succeed=True, show_trace=True):
   """
   Can be included in a list of generators (as in forall and forany) to see where we are.
@@ -216,13 +1199,18 @@ def trace(x, succeed=True, show_trace=True):
     yield
 
 
-def would_succeed(f):
+def would_succeed(f, cache: Optional[CallCache] = None):
   """
   Applied to a function so that the resulting function succeeds/fails iff the original succeeds/fails.
   If the original succeeds, this also succeeds but without binding any variables.
   Similar to a decorator but applied explicitly when used.
+  If cache (a CallCache) is given, the outcomes of ground calls are remembered there.
   """
   def would_succeed_wrapper(*args, **kwargs):
+    if cache is not None:
+      if cache.succeeds(f, args, kwargs):
+        yield
+      return
     succeeded = False
     for _ in f(*args, **kwargs):
       succeeded = True
@@ -0,0 +1,130 @@
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .logic_variables import PyValue, Term, unify_sequences, var_unification_chain_end
+
+
+class FactTable:
+  """
+  A relation stored as a table of ground facts, each a tuple of (hashable) Python values.
+
+  Calling a FactTable with logic variables (or Python values) as arguments, one per column,
+  unifies them with each matching fact in turn, as in Prolog. E.g.,
+
+      stops = FactTable(3, [('Biwako', 'Kyoto', 1), ('Kosei', 'Kyoto', 0), ...])
+      for _ in stops(Line, 'Kyoto', Position): ...
+
+  The facts are considered in the order in which they were added. Each column has a hash index from
+  values to the facts with that value in that column. An index is built the first time a call has
+  that column bound (i.e., instantiated), and it is kept up to date from then on. A call looks only at
+  the facts in the smallest index entry among its bound columns--rather than scanning the whole table.
+
+  A call sees the facts as they were when it started (Prolog's "logical update view"), so adding or
+  removing facts while it is running does not affect it.
+  """
+
+  def __init__(self, arity: int, facts: Iterable[Tuple] = ( )):
+    self.arity = arity
+    # Maps a row number to its fact. Rows are numbered in the order in which facts are added.
+    self.rows: Dict[int, Tuple] = {}
+    self.next_row = 0
+    # indexes[col], once built, maps each value in column col to the rows with that value. (Each is a
+    # dict used as an ordered set of row numbers.) None until a call first binds that column.
+    self.indexes: List[Optional[Dict[Hashable, Dict[int, None]]]] = [None] * arity
+    # Incremented whenever the table changes.
+    self.version = 0
+    self.extend(facts)
+
+  def __call__(self, *Args: Any):
+    """ Unify Args with each matching fact. """
+    if len(Args) != self.arity:
+      return
+    # The bound columns and their values; and the columns that must be unified with each fact.
+    (bound, open_cols) = ([], [])
+    for (col, Arg) in enumerate(Args):
+      Arg = var_unification_chain_end(Arg)
+      if isinstance(Arg, PyValue):
+        if Arg.is_instantiated( ):
+          bound.append((col, Arg.get_py_value( )))
+        else:
+          open_cols.append(col)
+      elif isinstance(Arg, Term):
+        # Uninstantiated Vars, Structures, etc.
+        open_cols.append(col)
+      else:
+        bound.append((col, Arg))
+
+    if bound:
+      entries = [self.index(col).get(value, { }) for (col, value) in bound]
+      candidates = min(entries, key=len)
+      # Facts in the smallest entry must also match the other bound columns.
+      checks = [(col, value) for ((col, value), entry) in zip(bound, entries) if entry is not candidates]
+      rows = self.rows
+      facts = [rows[row] for row in candidates]
+      if checks:
+        facts = [fact for fact in facts if all(fact[col] == value for (col, value) in checks)]
+    else:
+      facts = list(self.rows.values( ))
+
+    if not open_cols:
+      for _ in facts:
+        yield
+      return
+
+    Open_Args = [Args[col] for col in open_cols]
+    for fact in facts:
+      yield from unify_sequences(Open_Args, [fact[col] for col in open_cols])
+
+  def __contains__(self, fact: Tuple) -> bool:
+    fact = tuple(fact)
+    if not self.rows or len(fact) != self.arity:
+      return False
+    return any(self.rows[row] == fact for row in self.index(0).get(fact[0], { }))
+
+  def __iter__(self):
+    return iter(list(self.rows.values( )))
+
+  def __len__(self):
+    return len(self.rows)
+
+  def add(self, fact: Tuple):
+    """ Add fact at the end of the table. """
+    fact = tuple(fact)
+    if len(fact) != self.arity:
+      raise ValueError(f'{fact} does not have {self.arity} columns.')
+    row = self.next_row
+    self.next_row += 1
+    self.rows[row] = fact
+    for (index, value) in zip(self.indexes, fact):
+      if index is not None:
+        index.setdefault(value, { })[row] = None
+    self.version += 1
+
+  def extend(self, facts: Iterable[Tuple]):
+    for fact in facts:
+      self.add(fact)
+
+  def index(self, col: int) -> Dict[Hashable, Dict[int, None]]:
+    """ The index for column col. Built when first needed. """
+    index = self.indexes[col]
+    if index is None:
+      index = self.indexes[col] = { }
+      for (row, fact) in self.rows.items( ):
+        index.setdefault(fact[col], { })[row] = None
+    return index
+
+  def remove(self, fact: Tuple):
+    """ Remove the first occurrence of fact from the table. Does nothing if it isn't there. """
+    fact = tuple(fact)
+    if not self.rows or len(fact) != self.arity:
+      return
+    row = next((row for row in self.index(0).get(fact[0], { }) if self.rows[row] == fact), None)
+    if row is None:
+      return
+    del self.rows[row]
+    for (index, value) in zip(self.indexes, fact):
+      if index is not None:
+        entry = index[value]
+        del entry[row]
+        if not entry:
+          del index[value]
+    self.version += 1
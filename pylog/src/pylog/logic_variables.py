@@ -1,8 +1,12 @@
 from __future__ import annotations
-from functools import wraps
-from inspect import isgeneratorfunction
+from copy import copy
+from functools import lru_cache, wraps
+from inspect import Parameter, signature
+from math import inf
+from random import Random
+from threading import get_ident, Lock
 from numbers import Number
-from typing import Any, Iterable, List, Optional, Sequence, Sized, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Sized, Tuple, Union
 
 """
 Developed by Ian Piumarta as the "unify" library (http://www.ritsumei.ac.jp/~piumarta/pl/src/unify.py) for a
@@ -19,33 +23,98 @@ The pylog core, this file contains the logic variable and data structure classes
 def euc(f):
   """
   A decorator that takes unification_chain_end() of all Var arguments.
-  comment...
+
+  For speed, the wrapper is generated specifically for f. For, e.g.,
+
+    @euc
+    def unify(Left, Right): ...
+
+  it is (in effect)
+
+    def unify(Left, Right):
+      return f(Left.unification_chain_end( ) if isinstance(Left, Var) else Left,
+               Right.unification_chain_end( ) if isinstance(Right, Var) else Right)
+
+  The wrapper is an ordinary function even when f is a generator function. It returns f's generator
+  rather than adding a generator frame of its own that does yield from f(...). So the arguments are
+  dereferenced when the wrapper is called--not, as when the wrapper was itself a generator, when the
+  generator is first run. That is, a predicate's generator sees its arguments as they were bound when
+  it was made. If one is bound between then and the generator's first step, f still gets the Var: e.g.,
+  append's "if isinstance(Zs, Var)" test would take the wrong branch. So make a generator where it is
+  run--as forall and forany do, by calling the lambdas they are given--or, in f, dereference again any
+  argument that may be bound in between.
+
+  Functions with *args, **kwargs, or keyword-only parameters get a generic wrapper that does the same
+  thing for whatever arguments it is passed.
   """
+  wrapper = generated_euc_wrapper(f)
+  if wrapper is None:
 
-  def var_unification_chain_end(v):
-    return v.unification_chain_end() if isinstance(v, Var) else v
+    def euc_wrapper(*args, **kwargs):
+      args_unification_chain_ends = [var_unification_chain_end(arg) for arg in args]
+      kwargs_unification_chain_ends = {k: var_unification_chain_end(v) for (k, v) in kwargs.items()}
+      return f(*args_unification_chain_ends, **kwargs_unification_chain_ends)
 
-  def arg_Vars_unification_chain_ends(args):
-    args_unification_chain_ends = (var_unification_chain_end(arg) for arg in args)
-    return args_unification_chain_ends
+    wrapper = euc_wrapper
 
-  def dict_Vars_unification_chain_ends(dic):
-    dic_unification_chain_ends = {k: var_unification_chain_end(v) for (k, v) in dic.items()}
-    return dic_unification_chain_ends
+  return wraps(f)(wrapper)
 
-  @wraps(f)
-  def euc_wrapper_gen(*args, **kwargs):
-    args_unification_chain_ends = arg_Vars_unification_chain_ends(args)
-    kwargs_unification_chain_ends = dict_Vars_unification_chain_ends(kwargs)
-    yield from f(*args_unification_chain_ends, **kwargs_unification_chain_ends)
 
-  @wraps(f)
-  def euc_wrapper_non_gen(*args, **kwargs):
-    args = arg_Vars_unification_chain_ends(args)
-    kwargs_unification_chain_ends = dict_Vars_unification_chain_ends(kwargs)
-    return f(*args, **kwargs_unification_chain_ends)
+def generated_euc_wrapper(f):
+  """ Generate the euc wrapper for f if f's parameters are all ordinary ones. Otherwise return None. """
+  params = signature(f).parameters.values( )
+  if any(param.kind is not Parameter.POSITIONAL_OR_KEYWORD for param in params):
+    return None
+  names = [param.name for param in params]
+  # Names used in the generated code, which the parameters must not shadow.
+  if {'_euc_f', 'isinstance', 'Var'} & set(names):
+    return None
+  args_unification_chain_ends = ', '.join(f'{name}.unification_chain_end( ) if isinstance({name}, Var) else {name}'
+                                          for name in names)
+  source = (f'def make_wrapper(_euc_f):\n'
+            f'  def euc_wrapper({", ".join(names)}):\n'
+            f'    return _euc_f({args_unification_chain_ends})\n'
+            f'  return euc_wrapper\n')
+  namespace = {}
+  # Use this module's globals so that Var is looked up when the wrapper is called.
+  # (Some functions, e.g., Term.is_instantiated, are decorated before Var is defined.)
+  exec(source, globals( ), namespace)
+  wrapper = namespace['make_wrapper'](f)
+  wrapper.__defaults__ = f.__defaults__
+  return wrapper
+
+
+def var_unification_chain_end(v):
+  return v.unification_chain_end() if isinstance(v, Var) else v
+
+
+def cycle_safe(on_cycle):
+  """
+  A decorator for Structure methods, such as __str__ and get_py_value, that recurse through a Structure's args.
+
+  Unification without the occurs check can create cyclic ("rational") terms. E.g., unify(T, V) where
+  T = Structure(('t', 1, V)) makes T an arg of itself. If the decorated method is called on a Structure
+  while it is already running on that same Structure further up the stack, it returns on_cycle(self)
+  rather than recursing forever.
+  """
+  def decorator(method):
+    # The ids of the Structures on which the method is currently running.
+    in_progress = set( )
 
-  return euc_wrapper_gen if isgeneratorfunction(f) else euc_wrapper_non_gen
+    @wraps(method)
+    def cycle_safe_method(self):
+      self_id = id(self)
+      if self_id in in_progress:
+        return on_cycle(self)
+      in_progress.add(self_id)
+      try:
+        return method(self)
+      finally:
+        in_progress.discard(self_id)
+
+    return cycle_safe_method
+
+  return decorator
 
 
 class Term:
@@ -68,11 +137,16 @@ class Term:
                                                                                PyList      PyTuple
   """
 
+  # Terms are allocated in large numbers. Using __slots__ rather than a per-instance __dict__
+  # keeps them small. Subclasses declare their own __slots__ for the same reason.
+  __slots__ = ('_term_id', )
+
+  # The number of term_ids handed out so far.
   term_count = 0
 
   def __init__(self):
-    Term.term_count += 1
-    self.term_id = self.term_count
+    # A term_id is allocated only when it is needed, i.e., when an uninstantiated Var is printed.
+    self._term_id = None
 
   # @euc Can't use decorators on dunder methods without doing this:
   # (https://stackoverflow.com/questions/55550300/python-how-to-decorate-a-special-dunder-method).
@@ -102,6 +176,13 @@ class Term:
   def get_py_value(self) -> Any:
     return None
 
+  @property
+  def term_id(self) -> int:
+    if self._term_id is None:
+      Term.term_count += 1
+      self._term_id = Term.term_count
+    return self._term_id
+
   @euc
   def is_instantiated(self) -> bool:
     """ Should never get here since no unification_chain_end is a Term. """
@@ -119,9 +200,14 @@ def is_immutable(x):
 class PyValue(Term):
   """ A wrapper class for integers, strings, and other immutable Python value. """
 
+  __slots__ = ('_py_value', '_constant')
+
   def __init__(self, py_value: Optional[str, Number] = None ):
     assert is_immutable(py_value), f"Only immutable values are allowed as PyValues. {py_value} is mutable."
     self._py_value = py_value
+    # A PyValue created with a value is a constant: its value will never change. One created without
+    # a value may have a value assigned (and later un-assigned) by unify.
+    self._constant = py_value is not None
     super( ).__init__( )
 
   def __add__(self, other):
@@ -161,38 +247,139 @@ class Structure(Term):
   """
   self.functor is the functor
   self.args is a tuple of args
+  self._ground_hash is the structural hash of a ground Structure; None if the Structure is not ground.
+  self._open_args caches the args that may contain Vars, once they are needed. (See occurs_in.)
   """
+
+  __slots__ = ('functor', 'args', '_ground_hash', '_open_args')
+
+  # The (id(self), id(other)) pairs of the Structures currently being compared by __eq__.
+  _comparing = set( )
+
   def __init__(self, term: Tuple = ( None, () ) ):
     self.functor = term[0]
     self.args = tuple(map(ensure_is_logic_variable, term[1:]))
     super().__init__()
+    self._set_ground_hash( )
+    self._open_args = None
 
   def __eq__(self, other: Term) -> bool:
     other_euc = other.unification_chain_end()
-    return (other_euc is self or
-            isinstance(other_euc, Structure) and
+    if other_euc is self:
+      return True
+    if not (isinstance(other_euc, Structure) and
+            # If both are ground, they can be equal only if they have the same hash.
+            (self._ground_hash is None or other_euc._ground_hash is None or
+             self._ground_hash == other_euc._ground_hash) and
             self.functor == other_euc.functor and
-            len(self.args) == len(other_euc.args) and
-            all([selfArg == other_eucArg for (selfArg, other_eucArg) in zip(self.args, other_euc.args)]))
+            len(self.args) == len(other_euc.args)):
+      return False
+    # A ground Structure can't be cyclic. Otherwise, the two may be rational trees. If we are already
+    # comparing them further up the stack, they are equal unless some other pair of args differs.
+    if self._ground_hash is None or other_euc._ground_hash is None:
+      pair = (id(self), id(other_euc))
+      if pair in Structure._comparing:
+        return True
+      Structure._comparing.add(pair)
+      try:
+        return all([selfArg == other_eucArg for (selfArg, other_eucArg) in zip(self.args, other_euc.args)])
+      finally:
+        Structure._comparing.discard(pair)
+    return all([selfArg == other_eucArg for (selfArg, other_eucArg) in zip(self.args, other_euc.args)])
 
   def __getitem__(self, key: Union[int, slice]):
     return self.args[key]
 
+  def __getstate__(self) -> Dict[str, Any]:
+    """
+    The slots to pickle (and copy). _ground_hash is left out: it is built from hash( ) values, e.g., of
+    strs, which differ from one process to another. __setstate__ recomputes it. _open_args is a cache.
+    """
+    return {name: getattr(self, name) for cls in type(self).__mro__ for name in getattr(cls, '__slots__', ( ))
+            if name not in ('_ground_hash', '_open_args') and hasattr(self, name)}
+
+  def __setstate__(self, state: Dict[str, Any]):
+    for (name, value) in state.items( ):
+      setattr(self, name, value)
+    self._set_ground_hash( )
+    self._open_args = None
+
   # noinspection PySimplifyBooleanCheck
+  @cycle_safe(lambda _: '...')
   def __str__(self):
     args_str = self.values_string(self.args)
     result = f'{self.functor}({args_str})'
     return result
 
+  # A cyclic Structure has no finite py_value. Where the cycle closes, use the Structure itself.
+  @cycle_safe(lambda self: self)
   def get_py_value(self) -> Structure:
     py_value_args = [arg.get_py_value() for arg in self.args]
     return Structure( (self.functor, *py_value_args) )
 
+  def with_args(self, args: Iterable[Any]) -> Structure:
+    """ A Structure like this one (of the same class, with the same functor, etc.) but with args. """
+    new = copy(self)
+    new.args = tuple(map(ensure_is_logic_variable, args))
+    new._term_id = None
+    new._set_ground_hash( )
+    new._open_args = None
+    return new
+
+  def py_value_parts(self) -> Optional[Sequence[Term]]:
+    """
+    The Terms from whose py_values this Structure's py_value is built. (See snapshot_py_values.)
+    None means that its py_value is None, whatever its parts.
+    """
+    return self.args
+
+  def py_value_from_parts(self, part_values: List[Any]) -> Any:
+    """ This Structure's py_value, given the py_values of its py_value_parts( ). """
+    return Structure( (self.functor, *part_values) )
+
+  def is_ground(self) -> bool:
+    """
+    A Structure is ground if its args are all constant PyValues or ground Structures. Unlike a
+    Structure that is merely instantiated, a ground Structure can never change.
+    """
+    return self._ground_hash is not None
+
   def is_instantiated(self) -> bool:
     """ A Structure is instantiated if all its args are. """
+    return self._ground_hash is not None or self._args_are_instantiated( )
+
+  # Where a cyclic Structure reaches itself again, whether it is instantiated depends on its other args.
+  @cycle_safe(lambda _: True)
+  def _args_are_instantiated(self) -> bool:
     args_are_instantiated = all(arg.is_instantiated() for arg in self.args)
     return args_are_instantiated
 
+  def open_args(self) -> Tuple[Term, ...]:
+    """
+    The args that may contain Vars: the Vars and the Structures that are not ground.
+    (The args tuple never changes, so neither does this.) Computed when first needed.
+    """
+    if self._open_args is None:
+      self._open_args = tuple(arg for arg in self.args
+                              if isinstance(arg, Var) or isinstance(arg, Structure) and arg._ground_hash is None)
+    return self._open_args
+
+  def _set_ground_hash(self):
+    """
+    Compute self._ground_hash, once, when the Structure is created. Since the args were created first,
+    those that are Structures already know whether they are ground. So this doesn't recurse.
+    """
+    arg_hashes = []
+    for arg in self.args:
+      if isinstance(arg, PyValue) and arg._constant:
+        arg_hashes.append(hash(arg._py_value))
+      elif isinstance(arg, Structure) and arg._ground_hash is not None:
+        arg_hashes.append(arg._ground_hash)
+      else:
+        self._ground_hash = None
+        return
+    self._ground_hash = hash((self.functor, *arg_hashes))
+
   @staticmethod
   def values_string(values: Iterable):
     result = ', '.join(map(str, values))
@@ -206,11 +393,14 @@ class StructureItem(Structure):
   A utility class for building and displaying Structure-based items.
   """
 
+  __slots__ = ('first_arg_as_str_functor', )
+
   def __init__(self, args, first_arg_as_str_functor=False):
     self.first_arg_as_str_functor = first_arg_as_str_functor
     functor = type(self).__name__.lower( )
     super().__init__( (functor, *map(make_property, args)) )
 
+  @cycle_safe(lambda _: '...')
   def __str__(self):
     all_args_uninstantiated = all(isinstance(arg.unification_chain_end(), Var) for arg in self.args)
     if all_args_uninstantiated:
@@ -231,15 +421,23 @@ class Var(Term):
   A logic variable
   """
 
+  __slots__ = ('unification_chain_next', '_rank')
+
   def __init__(self):
     # self.unification_chain_next points to the next element on the unification_chain, if any.
     self.unification_chain_next = None
+    # An upper bound on the length of the longest unification_chain ending at this Var. (See _unify.)
+    self._rank = 0
     super().__init__()
 
   def __add__(self, other):
     return PyValue(self.get_py_value() + other.get_py_value())
 
   def __getattr__(self, item):
+    # Special names (which pickle, e.g., looks up) are not delegated. Neither are a Var's own slots,
+    # which are missing only while an unpickled Var is being rebuilt.
+    if item.startswith('__') or item in Var.__slots__:
+      raise AttributeError(item)
     self_euc = self.unification_chain_end()
     if self is not self_euc:
       return self_euc.__getattribute__(item)
@@ -273,8 +471,28 @@ class Var(Term):
   def unification_chain_end(self):
     """
     return: the Term, whatever it is, at the end of this Var's unification unification_chain.
+
+    Along the way, compress the unification_chain: point each Var on it directly to the end.
+    The compression is recorded on the trail so that backtracking restores the original chain.
+    (Not while searches are running in threads of their own: see ConcurrentTrail.)
     """
-    return self.unification_chain_next.unification_chain_end( ) if self._has_unification_chain_next( ) else self
+    Next = self.unification_chain_next
+    if Next is None:
+      return self
+    # The usual case: Next is the end.
+    if not isinstance(Next, Var) or Next.unification_chain_next is None:
+      return Next
+    End = Next
+    while isinstance(End, Var) and End.unification_chain_next is not None:
+      End = End.unification_chain_next
+    if not trail.compress_chains:
+      return End
+    Chain_Var = self
+    while Chain_Var.unification_chain_next is not End:
+      Next = Chain_Var.unification_chain_next
+      trail.bind(Chain_Var, 'unification_chain_next', End)
+      Chain_Var = Next
+    return End
 
 
 # @staticmethod
@@ -284,8 +502,28 @@ def ensure_is_logic_variable(x: Any) -> Term:
     Applies PyValue to those that are not already Terms.
     If x is not a logic variable, i.e., an instance of Term, it must be a Python value.
     Wrap it in PyValue. (It must be immutable.)
+    Simple constants are interned: each one is wrapped by a single shared PyValue.
+    (Except float zeros and NaNs: -0.0 == 0.0, so the cache can't tell them apart; and NaN != NaN.)
+  """
+  return x if isinstance(x, Term) else \
+         interned_PyValue(x) if type(x) in internable_types and (type(x) is not float or x == x != 0) else \
+         PyValue(x)
+
+
+# The types whose values interned_PyValue shares. None is not among them: PyValue(None) is
+# uninstantiated and may be bound, so each one must be distinct. Tuples and frozensets are left out
+# because their elements might be equal without being the same type, e.g., (1, ) and (True, ).
+internable_types = frozenset({bool, int, float, str})
+
+
+@lru_cache(maxsize=2**16, typed=True)
+def interned_PyValue(py_value: Union[bool, int, float, str]) -> PyValue:
+  """
+  The shared PyValue for py_value. This is safe because an instantiated PyValue is never changed:
+  unify assigns values only to uninstantiated PyValues. typed=True keeps, e.g., 1, 1.0, and True
+  apart. The table is bounded; the least recently used entries are dropped when it fills up.
   """
-  return x if isinstance(x, Term) else PyValue(x)
+  return PyValue(py_value)
 
 
 def make_property(prop):
@@ -302,6 +540,239 @@ def n_Vars(n: int) -> List[Var]:
   return [Var( ) for _ in range(n)]
 
 
+class Trail:
+  """
+  The global binding trail, as in the WAM.
+
+  Every binding made by unify( ) is recorded on the trail as an (object, attribute, old_value) triple
+  before the attribute is changed. A choicepoint remembers the length of the trail (its mark) when it
+  is created. Backtracking to that choicepoint truncates the trail back to the mark, restoring the
+  recorded attributes, most recent first.
+
+  Because the trail is shared, choicepoints must be resumed in last-in-first-out order--which is
+  what nested for-loops (and Prolog's depth-first search) do.
+
+  While searches are running in threads of their own (see Bool_Yield_Wrapper's async mode), each
+  thread has a trail of its own. (See enter_concurrent( ).)
+  """
+
+  # Whether unification_chain_end may compress chains. (See ConcurrentTrail.)
+  compress_chains = True
+
+  def __init__(self):
+    self.entries: List[Tuple[Any, str, Any]] = []
+    # The number of unifications attempted, i.e., of inference steps.
+    self.inferences = 0
+    # When inferences reaches checkpoint_at, unification calls checkpoint( ) before going on.
+    # Searches use it to stop or pause every so often. (See, e.g., Bool_Yield_Wrapper.__anext__.)
+    self.checkpoint_at = inf
+    self.checkpoint: Optional[Callable[[], None]] = None
+    # The number of searches running in threads of their own, and the lock that guards it.
+    self.concurrent_searches = 0
+    self.concurrency_lock = Lock( )
+    # While there are any: each thread's TrailState, and the thread that started the first of them.
+    self.states: Dict[int, TrailState] = { }
+    self.home = 0
+
+  def enter_concurrent(self):
+    """
+    Note that a search is about to run in a thread of its own. With the first one, each thread gets a
+    trail of its own: the calling thread keeps this one's entries, etc.; the others start out empty.
+    """
+    with self.concurrency_lock:
+      if self.concurrent_searches == 0:
+        self.home = get_ident( )
+        self.states = {self.home: TrailState(*(getattr(self, name) for name in TrailState.__slots__))}
+        self.__class__ = ConcurrentTrail
+      self.concurrent_searches += 1
+
+  def exit_concurrent(self):
+    """
+    Note that such a search is done. (Called from its thread, whose trail is dropped.) After the last
+    one, the trail is again the one the thread that called enter_concurrent( ) first had.
+    """
+    with self.concurrency_lock:
+      self.concurrent_searches -= 1
+      if get_ident( ) != self.home:
+        self.states.pop(get_ident( ), None)
+      if self.concurrent_searches == 0:
+        home = self.states[self.home]
+        for name in TrailState.__slots__:
+          self.__dict__[name] = getattr(home, name)
+        self.__class__ = Trail
+        self.states = { }
+
+  def bind(self, obj: Any, attr: str, value: Any):
+    """ Set obj.attr to value, recording its old value so that it can be restored. """
+    self.entries.append((obj, attr, getattr(obj, attr)))
+    setattr(obj, attr, value)
+
+  def mark(self) -> int:
+    return len(self.entries)
+
+  def step(self):
+    """ Count an inference step taken some other way than by unification. """
+    self.inferences += 1
+    if self.inferences >= self.checkpoint_at:
+      self.checkpoint( )
+
+  def undo_to(self, mark: int):
+    """ Restore every binding recorded since mark was taken. """
+    entries = self.entries
+    while len(entries) > mark:
+      (obj, attr, old_value) = entries.pop()
+      setattr(obj, attr, old_value)
+
+
+class TrailState:
+  """ One thread's entries, inferences, etc., while searches are running in threads of their own. """
+  __slots__ = ('entries', 'inferences', 'checkpoint_at', 'checkpoint')
+
+  def __init__(self, entries: list, inferences: int = 0, checkpoint_at: float = inf,
+               checkpoint: Optional[Callable[[], None]] = None):
+    (self.entries, self.inferences, self.checkpoint_at, self.checkpoint) = \
+      (entries, inferences, checkpoint_at, checkpoint)
+
+
+def thread_state_property(name: str) -> property:
+  """ A property that gets and sets name in the calling thread's TrailState. """
+
+  def state(trail: ConcurrentTrail) -> TrailState:
+    ident = get_ident( )
+    found = trail.states.get(ident)
+    return found if found is not None else trail.states.setdefault(ident, TrailState([ ]))
+
+  return property(lambda trail: getattr(state(trail), name),
+                  lambda trail, value: setattr(state(trail), name, value))
+
+
+class ConcurrentTrail(Trail):
+  """
+  The trail while searches are running in threads of their own. (Trail.enter_concurrent switches the
+  trail's class to this one, and exit_concurrent switches it back.) Its entries, inferences, etc., are
+  those of the calling thread. So a search records its bindings on its own thread's trail, and pylog
+  code in other threads, e.g., the event loop's, records theirs on theirs--and the rest of the time the
+  trail costs no more than it did.
+
+  Chains are not compressed: a compression would be recorded on one thread's trail, but the bindings
+  it bypasses may be recorded on another's and undone while the compression remains.
+  """
+  compress_chains = False
+
+  entries = thread_state_property('entries')
+  inferences = thread_state_property('inferences')
+  checkpoint_at = thread_state_property('checkpoint_at')
+  checkpoint = thread_state_property('checkpoint')
+
+
+def copy_terms(terms: Sequence[Any]) -> tuple:
+  """
+  Copies of terms as they are now instantiated. Each uninstantiated Var (or PyValue) is replaced by
+  a fresh one--the same fresh one wherever it occurs. The copies are not affected when the bindings
+  of the originals are undone. (Ground Structures can't change, so they are shared, not copied.)
+  """
+  fresh = {}
+
+  def copy_term(T: Any) -> Any:
+    T = var_unification_chain_end(T)
+    if isinstance(T, Structure):
+      return T if T._ground_hash is not None else T.with_args([copy_term(arg) for arg in T.args])
+    if isinstance(T, PyValue):
+      return T if T._constant else \
+             ensure_is_logic_variable(T._py_value) if T._py_value is not None else \
+             fresh.setdefault(id(T), PyValue( ))
+    if isinstance(T, Var):
+      return fresh.setdefault(id(T), FDVar(T.domain) if isinstance(T, FDVar) else Var( ))
+    return T
+
+  return tuple(copy_term(T) for T in terms)
+
+
+def variant_key(terms: Sequence[Any]) -> tuple:
+  """
+  A hashable key for terms as they are now instantiated. Two sequences of terms have the same key
+  iff they are variants: they are the same except for the names of their uninstantiated Vars.
+  As in unify, a Structure is its functor and args: its class (e.g., a StructureItem's) isn't part
+  of its key. The values of PyValues must be hashable.
+  """
+  return _variant_key(terms, { })
+
+
+def ground_key(terms: Sequence[Any]) -> Optional[tuple]:
+  """ variant_key(terms) if terms are ground, i.e., contain no uninstantiated Vars; otherwise None. """
+  numbers = { }
+  key = _variant_key(terms, numbers)
+  return None if numbers else key
+
+
+def _variant_key(terms: Sequence[Any], numbers: Dict[int, int]) -> tuple:
+  """ numbers maps the id of each uninstantiated Var (or PyValue) found to its number. """
+
+  def key(T: Any) -> Any:
+    T = var_unification_chain_end(T)
+    if isinstance(T, Structure):
+      return (Structure, T.functor, len(T.args), *map(key, T.args))
+    if isinstance(T, PyValue):
+      return T._py_value if T._py_value is not None else (Var, numbers.setdefault(id(T), len(numbers)))
+    if isinstance(T, Var):
+      number = numbers.setdefault(id(T), len(numbers))
+      return (FDVar, number, T.domain) if isinstance(T, FDVar) else (Var, number)
+    return T
+
+  return tuple(map(key, terms))
+
+
+def snapshot_py_values(terms: Sequence[Any]) -> tuple:
+  """
+  A tuple of the py_values of terms, i.e., what their get_py_value( ) methods would return.
+
+  Resolves all the terms in one iterative pass: each Var is dereferenced once, and each Term--
+  including Structures shared among the terms--is resolved once. The result consists of plain
+  Python values, which remain valid after backtracking undoes the bindings.
+  """
+  # Maps the id of each resolved Term (the end of any unification_chain) to (py_value, is_instantiated).
+  resolved = {}
+
+  def value_of(Part: Any) -> Any:
+    (py_value, is_instantiated) = resolved[id(var_unification_chain_end(Part))]
+    # As in Var.get_py_value, a Var's py_value is None unless its unification_chain end is instantiated.
+    return py_value if is_instantiated or not isinstance(Part, Var) else None
+
+  # Stack entries are (Term, None) before the Term is resolved and (Structure, parts) once the
+  # Structure's parts have been pushed, i.e., when it is popped again, after they have been resolved.
+  stack = [(T, None) for T in reversed(terms)]
+  while stack:
+    (T, parts) = stack.pop( )
+    if parts is not None:
+      resolved[id(T)] = (T.py_value_from_parts([value_of(Part) for Part in parts]),
+                         all(resolved[id(var_unification_chain_end(Part))][1] for Part in parts))
+      continue
+    T = var_unification_chain_end(T)
+    if id(T) in resolved:
+      continue
+    if isinstance(T, Structure):
+      parts = T.py_value_parts( )
+      if parts is None:
+        resolved[id(T)] = (None, False)
+        continue
+      # Until its parts are resolved, a Structure stands for itself. That's its py_value where
+      # a cyclic Structure reaches itself. (See cycle_safe.)
+      resolved[id(T)] = (T, True)
+      stack.append((T, parts))
+      stack.extend((Part, None) for Part in reversed(parts))
+    elif isinstance(T, PyValue):
+      resolved[id(T)] = (T._py_value, T._py_value is not None)
+    elif isinstance(T, Var):
+      resolved[id(T)] = (None, False)
+    else:
+      resolved[id(T)] = (T, True)
+  return tuple(value_of(T) for T in terms)
+
+
+# The single trail on which all bindings are recorded.
+trail = Trail()
+
+
 # noinspection PyProtectedMember
 @euc
 def unify(Left: Any, Right: Any):
@@ -316,93 +787,428 @@ def unify(Left: Any, Right: Any):
   o a non-Var, in which case the value of all preceding variables is the value of that non-Var, or
   o a Var (which is not linked to any further element), in which case, all variables on the unification_chain
     are unified but do not (yet) have a value.
+
+  All the bindings are made (by _unify) in this one generator frame and recorded on the trail.
+  On "backup," the trail is truncated back to where it was when we started, which un-does them.
   """
+  mark = trail.mark( )
+  if _unify(Left, Right):
+    yield
+  # All yields create a context in which more of the program is executed--like
+  # the body of a while-loop or a for-loop. A "next()" request asks for alternatives.
+  # But there is only one functional way to do unification. So on "backup," undo the
+  # bindings and exit without a further yield, i.e., fail.
 
-  # Make sure both Left and Right are logic variables. This allows us to call, e.g, unify(X, 'abc').
-  # ensure_is_logic_variable will wrap 'abc' in a PyValue.
-  (Left, Right) = map(ensure_is_logic_variable, (Left, Right))
+  # This is fundamental! It's what makes it possible for a Var to become un-unified outside
+  # the context in which it was unified, e.g., unifying a Var with (successive) members
+  # of a list. The first successful unification must be undone before the second can occur.
+  trail.undo_to(mark)
+
+
+def _unify(Left: Any, Right: Any) -> bool:
+  """
+  Make the bindings that unify Left and Right, recording them on the trail.
+  Returns whether unification succeeded. Either way, the caller is responsible for
+  undoing the bindings (by truncating the trail).
+  """
+  return _unify_sequences((Left,), (Right,))
+
+
+def _unify_sequences(seq_1: Sequence, seq_2: Sequence) -> bool:
+  """
+  The _unify version of unify_sequences. This is the unification engine.
+
+  Rather than recursing into the args of Structures, it keeps an explicit stack of cursors:
+  (Lefts, Rights, i) says that Lefts[i:] and Rights[i:] remain to be unified. So neither
+  the length of a sequence nor the depth of a Structure is limited by Python's recursion limit,
+  and no sequence is ever copied. Pairs are unified left to right, depth first--the same order
+  in which a recursive version would unify them.
+  """
+  trail.inferences += 1
+  if trail.inferences >= trail.checkpoint_at:
+    trail.checkpoint( )
+  # The two sequences must be the same length.
+  if len(seq_1) != len(seq_2):
+    return False
+  pending = []
+  # The propagators of the FDVars this unification narrows. They run once it has otherwise succeeded.
+  woken = None
+  (Lefts, Rights, i, n) = (seq_1, seq_2, 0, len(seq_1))
+  while True:
+    if i == n:
+      # Done with these sequences. Go back to where we left off in the enclosing ones.
+      if not pending:
+        return woken is None or propagate(woken)
+      (Lefts, Rights, i) = pending.pop( )
+      n = len(Lefts)
+      continue
+
+    (Left, Right) = (Lefts[i], Rights[i])
+    i += 1
+
+    # Make sure both Left and Right are logic variables. This allows us to call, e.g, unify(X, 'abc').
+    # (That's what ensure_is_logic_variable would do: wrap 'abc' in a PyValue.)
+    # Then take their unification_chain_ends.
+    if isinstance(Left, Var):
+      Left = Left.unification_chain_end( )
+    elif not isinstance(Left, Term):
+      Left = ensure_is_logic_variable(Left)
+    if isinstance(Right, Var):
+      Right = Right.unification_chain_end( )
+    elif not isinstance(Right, Term):
+      Right = ensure_is_logic_variable(Right)
+
+    # If the unification_chain_ends are the same Term, they are already unified--unless they are the
+    # same uninstantiated PyValue, which, like two distinct uninstantiated PyValues, does not unify.
+    if Left is Right:
+      if isinstance(Left, PyValue) and not Left.is_instantiated( ):
+        return False
+      continue
+
+    # The rest consists of special cases: both PyValues, both Structures, at least one Var.
+
+    # Case 1. Both are PyValues. If both are instantiated, they unify if their values are equal.
+    # If exactly one is instantiated, "assign" its value to the other. This is similar to (but simpler
+    # than) how we handle two Var's. But instead of building a unification_chain, we "assign"
+    # one value to the other. Two uninstantiated PyValues do not unify.
+    if isinstance(Left, PyValue) and isinstance(Right, PyValue):
+      (Left_is_instantiated, Right_is_instantiated) = (Left.is_instantiated( ), Right.is_instantiated( ))
+      if Left_is_instantiated and Right_is_instantiated:
+        if Left.get_py_value( ) == Right.get_py_value( ):
+          continue
+        return False
+      if not Left_is_instantiated and not Right_is_instantiated:
+        return False
+      (assignedTo, assignedFrom) = (Left, Right) if Right_is_instantiated else (Right, Left)
+      trail.bind(assignedTo, '_py_value', assignedFrom.get_py_value( ))
+      continue
+
+    # Case 2. Both  Structures. They can be unified if
+    # (a) they have the same functor and
+    # (b) their arguments can be unified.
+    # If both are ground, there are no bindings to make. They unify if they are equal,
+    # which they can't be if their hashes differ.
+    if isinstance(Left, Structure) and isinstance(Right, Structure):
+      if Left._ground_hash is not None and Right._ground_hash is not None and \
+         Left._ground_hash != Right._ground_hash:
+        return False
+      if Left.functor != Right.functor or len(Left.args) != len(Right.args):
+        return False
+      # Push a cursor for the rest of the current sequences and start on the args.
+      if i < n:
+        pending.append((Lefts, Rights, i))
+      (Lefts, Rights, i, n) = (Left.args, Right.args, 0, len(Left.args))
+      continue
+
+    # Case 3. At least one is a Var, which is the end of its unification_chain.
+    # Make the other an extension of its unification_chain.
+    # If both are Vars, it makes no functional difference which extends which. So use union-by-rank:
+    # point the Var with the lower rank to the other, which keeps unification_chains short.
+    if isinstance(Left, Var) or isinstance(Right, Var):
+      if not isinstance(Right, Var):
+        (pointsFrom, pointsTo) = (Left, Right)
+      elif not isinstance(Left, Var) or Left._rank > Right._rank:
+        (pointsFrom, pointsTo) = (Right, Left)
+      else:
+        (pointsFrom, pointsTo) = (Left, Right)
+        if Left._rank == Right._rank:
+          trail.bind(Right, '_rank', Right._rank + 1)
+      # With the occurs check on, a Var may not be bound to a Structure that contains it.
+      if occurs_check and isinstance(pointsTo, Structure) and pointsTo._ground_hash is None and \
+         occurs_in(pointsFrom, pointsTo):
+        return False
+      # An FDVar keeps its domain at the end of the unification_chain, where a plain Var can point to it.
+      # Binding it to a value or to another FDVar must respect (and may narrow) its domain.
+      if isinstance(pointsFrom, FDVar):
+        if isinstance(pointsTo, Var) and not isinstance(pointsTo, FDVar):
+          (pointsFrom, pointsTo) = (pointsTo, pointsFrom)
+        else:
+          to_wake = pointsFrom.restrict_to(pointsTo)
+          if to_wake is None:
+            return False
+          woken = to_wake if woken is None else woken + to_wake
+      trail.bind(pointsFrom, 'unification_chain_next', pointsTo)
+      continue
+
+    return False
 
-  # If the unification_chain_ends are equal, either because they have the same py_value or Structure or
-  # because they are the same (unbound) Var, do nothing. They are already unified.
-  # yield to indicate unification success. If Left and Right are both
-  # uninstantiated PyValues, Left != Right. (See PyValue.__eq__.)
-  if Left == Right:
-    yield
 
-  # The rest consists of special cases: both PyValues, both Structures, at least one Var.
-
-  # Case 1. Both are PyValues, and exactly one is instantiated.
-  # "Assign" it's value to the other. This is similar to (but simpler than)
-  # how we handle two Var's. But instead of building a unification_chain, we "assign"
-  # one value to the other.
-  elif isinstance(Left, PyValue) and isinstance(Right, PyValue) and \
-       (not Left.is_instantiated( ) or not Right.is_instantiated( )) and \
-       (Left.is_instantiated( ) or Right.is_instantiated( )):
-    (assignedTo, assignedFrom) = (Left, Right) if Right.is_instantiated( ) else (Right, Left)
-    assignedTo._set_py_value(assignedFrom.get_py_value( ))
+# Whether unification performs the occurs check. It is off by default, as in most Prologs: without it,
+# unify(V, Structure(('t', V))) succeeds and creates a cyclic ("rational") term. Printing, comparing, and
+# taking the py_value of such terms terminate. (See cycle_safe.) Set it to True for sound unification.
+occurs_check = False
+
+
+def occurs_in(V: Var, S: Structure) -> bool:
+  """
+  Does V, the end of its unification_chain, occur in S? Searches iteratively and visits each
+  Structure once, so it terminates on cyclic terms. Ground Structures can't contain V and are skipped.
+  """
+  (seen, stack) = (set( ), [S])
+  while stack:
+    T = stack.pop( )
+    if isinstance(T, Var):
+      T = T.unification_chain_end( )
+      if T is V:
+        return True
+    if isinstance(T, Structure) and T._ground_hash is None and id(T) not in seen:
+      seen.add(id(T))
+      stack.extend(T.open_args( ))
+  return False
+
+
+class FDVar(Var):
+  """
+  A finite-domain logic variable: a Var that may be bound only to one of the values in its domain.
+
+  self.domain is the frozenset of values still available to it.
+  self.propagators are the constraints (see Propagator) that watch it.
+
+  Constraints narrow domains. Like bindings, narrowings are recorded on the trail, so backtracking
+  restores them. When a domain narrows to a single value, the FDVar is bound to that value.
+  """
+
+  __slots__ = ('domain', 'propagators')
+
+  def __init__(self, domain: Iterable):
+    super().__init__()
+    self.domain = frozenset(domain)
+    self.propagators: Tuple[Propagator, ...] = ( )
+
+  def restrict_to(self, Other: Term) -> Optional[Tuple[Propagator, ...]]:
+    """
+    Called by unification before this FDVar, the end of its unification_chain, is bound to Other.
+    Other must be a value in the domain or an FDVar, whose domain becomes the intersection of the two
+    domains and which takes over this FDVar's propagators.
+    Returns the propagators to run once the unification succeeds--or None if the binding is not allowed.
+    """
+    if isinstance(Other, PyValue):
+      return self.propagators if Other.is_instantiated( ) and Other.get_py_value( ) in self.domain else None
+    if isinstance(Other, FDVar):
+      domain = self.domain & Other.domain
+      if not domain:
+        return None
+      trail.bind(Other, 'propagators', Other.propagators + self.propagators)
+      if len(domain) < len(Other.domain):
+        Other.set_domain(domain)
+      return Other.propagators
+    return None
+
+  def set_domain(self, domain: frozenset):
+    """ Narrow the (non-empty) domain. If only one value remains, bind this FDVar to it. """
+    trail.bind(self, 'domain', domain)
+    if len(domain) == 1:
+      trail.bind(self, 'unification_chain_next', ensure_is_logic_variable(next(iter(domain))))
+
+
+class Propagator:
+  """
+  A constraint among some Vars. Its propagate( ) method narrows their domains (through narrow)
+  and returns False if the constraint cannot be satisfied. It runs whenever one of their domains changes.
+
+  A Propagator holds the Vars it was created with. It looks at them through domain_of, which
+  dereferences them, since they may have become bound.
+  """
+
+  __slots__ = ('Vars', 'queued')
+
+  def __init__(self, Vars: Iterable[Any]):
+    self.Vars = tuple(map(ensure_is_logic_variable, Vars))
+    self.queued = False
+
+  def propagate(self) -> bool:
+    return True
+
+
+def domain_of(T: Term) -> Optional[frozenset]:
+  """ The values T may take: the domain of an FDVar, {value} for a value; None if unconstrained. """
+  T = var_unification_chain_end(T)
+  if isinstance(T, FDVar):
+    return T.domain
+  if isinstance(T, PyValue) and T.is_instantiated( ):
+    return frozenset((T.get_py_value( ), ))
+  return None
+
+
+def narrow(T: Term, domain: frozenset) -> bool:
+  """
+  Narrow the domain of T to its intersection with domain. Fails (returns False) if nothing remains.
+  If T is an FDVar whose domain has changed, schedule its propagators. If only one value remains, bind T to it.
+  """
+  T = var_unification_chain_end(T)
+  if not isinstance(T, FDVar):
+    return not (isinstance(T, PyValue) and T.is_instantiated( )) or T.get_py_value( ) in domain
+  new_domain = T.domain & domain
+  if len(new_domain) == len(T.domain):
+    return True
+  if not new_domain:
+    return False
+  T.set_domain(new_domain)
+  schedule(T.propagators)
+  return True
+
+
+# The Propagators waiting to run. Empty except during propagate( ).
+propagation_queue: List[Propagator] = []
+
+
+def schedule(propagators: Iterable[Propagator]):
+  for propagator in propagators:
+    if not propagator.queued:
+      propagator.queued = True
+      propagation_queue.append(propagator)
+
+
+def propagate(propagators: Iterable[Propagator]) -> bool:
+  """
+  Run propagators, and the propagators of any FDVars they narrow, until no domain changes.
+  Returns False if some constraint cannot be satisfied.
+  """
+  schedule(propagators)
+  while propagation_queue:
+    propagator = propagation_queue.pop( )
+    propagator.queued = False
+    if not propagator.propagate( ):
+      for propagator in propagation_queue:
+        propagator.queued = False
+      propagation_queue.clear( )
+      return False
+  return True
+
+
+def post(propagator: Propagator):
+  """ Add a constraint to the Vars it constrains. Succeeds once if the constraint can (still) be satisfied. """
+  mark = trail.mark( )
+  for V in propagator.Vars:
+    V = var_unification_chain_end(V)
+    if isinstance(V, FDVar):
+      trail.bind(V, 'propagators', V.propagators + (propagator, ))
+  if propagate((propagator, )):
     yield
-    # See discussion in unify below for why we do this.
-    assignedTo._set_py_value(None)
-    #
-    # # If they are both PyValues, treat specially.
-    # yield from unify_PyValues(Left, Right)
-    
-  # Case 2. Both  Structures. They can be unified if
-  # (a) they have the same functor and
-  # (b) their arguments can be unified.
-  elif isinstance(Left, Structure) and isinstance(Right, Structure) and Left.functor == Right.functor:
-    yield from unify_sequences(Left.args, Right.args)
-
-  # Case 3. At least one is a Var. Since we use @euc, it's the end of its unification_chain.
-  # Make the other an extension of its unification_chain.
-  # (If both are Vars, it makes no functional difference which extends which.)
-  elif isinstance(Left, Var) or isinstance(Right, Var):
-    (pointsFrom, pointsTo) = (Left, Right) if isinstance(Left, Var) else (Right, Left)
-    pointsFrom.unification_chain_next = pointsTo
+  trail.undo_to(mark)
+
+
+class AllDifferent(Propagator):
+  """ No two of the Vars have the same value. """
+
+  __slots__ = ( )
+
+  def propagate(self) -> bool:
+    domains = [domain_of(V) for V in self.Vars]
+    # Remove each value that has been taken from the domains of all the others.
+    # (narrow binds a Var whose domain shrinks to one value. That reschedules this propagator.)
+    taken = set( )
+    for domain in domains:
+      if domain is not None and len(domain) == 1:
+        if not taken.isdisjoint(domain):
+          return False
+        taken |= domain
+    for (V, domain) in zip(self.Vars, domains):
+      if domain is not None and len(domain) > 1 and not domain.isdisjoint(taken):
+        if not narrow(V, domain - taken):
+          return False
+    # Pigeonhole: n Vars need at least n values among them.
+    if all(domain is not None for domain in domains):
+      return len(frozenset( ).union(*domains)) >= len(domains)
+    return True
+
+
+class NotEqual(Propagator):
+  """ The two Vars have different values. """
+
+  __slots__ = ( )
+
+  def propagate(self) -> bool:
+    (X, Y) = self.Vars
+    (X_domain, Y_domain) = (domain_of(X), domain_of(Y))
+    if X_domain is not None and len(X_domain) == 1 and Y_domain is not None and not narrow(Y, Y_domain - X_domain):
+      return False
+    if Y_domain is not None and len(Y_domain) == 1 and X_domain is not None and not narrow(X, X_domain - Y_domain):
+      return False
+    return True
+
+
+class SumEquals(Propagator):
+  """
+  The Vars, whose domains are numbers, add up to total--each multiplied by its coefficient, if
+  coefficients are given. Narrows the domains to values consistent with the bounds of the others.
+  """
+
+  __slots__ = ('coefficients', 'total')
+
+  def __init__(self, Vars: Iterable[Any], total: Number, coefficients: Optional[Iterable[Number]] = None):
+    super().__init__(Vars)
+    self.coefficients = (1, ) * len(self.Vars) if coefficients is None else tuple(coefficients)
+    self.total = total
+
+  def propagate(self) -> bool:
+    domains = [domain_of(V) for V in self.Vars]
+    if any(domain is None for domain in domains):
+      return True
+    # The smallest and largest values of each coefficient * Var.
+    bounds = [(c*min(domain), c*max(domain)) if c >= 0 else (c*max(domain), c*min(domain))
+              for (c, domain) in zip(self.coefficients, domains)]
+    (sum_los, sum_his) = (sum(lo for (lo, _) in bounds), sum(hi for (_, hi) in bounds))
+    if not sum_los <= self.total <= sum_his:
+      return False
+    for (V, c, domain, (lo, hi)) in zip(self.Vars, self.coefficients, domains, bounds):
+      # The other terms add up to at least sum_los - lo and at most sum_his - hi.
+      (new_lo, new_hi) = (self.total - (sum_his - hi), self.total - (sum_los - lo))
+      if lo < new_lo or hi > new_hi:
+        if not narrow(V, frozenset(value for value in domain if new_lo <= c*value <= new_hi)):
+          return False
+    return True
+
+
+def all_different(Vars: Iterable[Any]):
+  """ Succeeds if the Vars can all have different values, and constrains them to do so. """
+  yield from post(AllDifferent(Vars))
+
+
+def not_equal(X: Any, Y: Any):
+  yield from post(NotEqual((X, Y)))
+
+
+def sum_equals(Vars: Iterable[Any], total: Number, coefficients: Optional[Iterable[Number]] = None):
+  """ sum(c*V for (c, V) in zip(coefficients, Vars)) == total. By default, the coefficients are all 1. """
+  yield from post(SumEquals(Vars, total, coefficients))
+
+
+def label(Vars: Sequence[Any], rng: Optional[Random] = None):
+  """
+  Bind the Vars to values from their domains, in all possible ways. Picks the FDVar with the
+  smallest domain first (first-fail). Its values are tried in increasing order.
+  If rng (a random.Random) is given, ties among the smallest domains are broken at random.
+  """
+  FDVars = [V for V in map(var_unification_chain_end, Vars) if isinstance(V, FDVar)]
+  if not FDVars:
     yield
-    # All yields create a context in which more of the program is executed--like
-    # the body of a while-loop or a for-loop. A "next()" request asks for alternatives.
-    # But there is only one functional way to do unification. So on "backup," unlink the
-    # two and exit without a further yield, i.e., fail.
+  else:
+    if rng is None:
+      V = min(FDVars, key=lambda FDV: len(FDV.domain))
+    else:
+      smallest = min(len(FDV.domain) for FDV in FDVars)
+      V = rng.choice([FDV for FDV in FDVars if len(FDV.domain) == smallest])
+    for value in sorted(V.domain):
+      for _ in unify(V, value):
+        yield from label(FDVars, rng)
 
-    # This is fundamental! It's what makes it possible for a Var to become un-unified outside
-    # the context in which it was unified, e.g., unifying a Var with (successive) members
-    # of a list. The first successful unification must be undone before the second can occur.
-    pointsFrom.unification_chain_next = None
 
-    
 def unify_pairs(tuples: List[Tuple[Any, Any]]):
   """ Apply unify to pairs of terms. """
-  # If no more tuples, we are done.
-  if not tuples:
+  mark = trail.mark( )
+  # If all the pairs unify, succeed once--with all the bindings in place.
+  if all(_unify(Left, Right) for (Left, Right) in tuples):
     yield
-  else:
-    # Get the first tuple from the tuples list.
-    [(Left, Right), *restOfTuples] = tuples
-    # If they unify, go on to the rest of the tuples list.
-    for _ in unify(Left, Right):
-      yield from unify_pairs(restOfTuples)
-    # The preceding is equivalent to the following.
-    # for _ in forall([lambda: unify(Left, Right),
-    #                  lambda: unify_pairs(restOfTuples)]):
-    #   yield
+  trail.undo_to(mark)
 
 
 def unify_sequences(seq_1: Sequence, seq_2: Sequence):
   """ Unify simple sequences, e.g., lists or tuples, of Terms. """
-  # The two sequences must be the same length.
-  if len(seq_1) != len(seq_2):
-    return
-
-  # If they are both empty, we are done.
-  if len(seq_1) == 0:
+  mark = trail.mark( )
+  if _unify_sequences(seq_1, seq_2):
     yield
-
-  else:
-    # Unify the two first elements. If successful go on to the rest.
-    # Note that slice notation is supported.
-    for _ in unify(seq_1[0], seq_2[0]):
-      yield from unify_sequences(seq_1[1:], seq_2[1:])
+  trail.undo_to(mark)
 
 
 if __name__ == '__main__':
@@ -543,7 +1349,7 @@ if __name__ == '__main__':
   #   print(f'V4[1] is T4: {V4[1] is T4}')
   #   print(f'V4[1] == T4: {V4[1] == T4}, '
   #         f'because: V4[1].unification_chain_end() is T4: {V4[1].unification_chain_end() is T4}')
-  #   print('An attempt to print T4 or V4 will produce "RecursionError: maximum recursion depth exceeded"')
+  #   print(f'T4: {T4}, V4: {V4}')
   #   print('\nEnd of fifth test.')
   #
   # """
@@ -555,7 +1361,7 @@ if __name__ == '__main__':
   # V4[0]: 1
   # V4[1] is T4: False
   # V4[1] == T4: True, because: V4[1].unification_chain_end() is T4: True
-  # An attempt to print T4 or V4 will produce "RecursionError: maximum recursion depth exceeded"
+  # T4: t(1, t(1, ...)), V4: t(1, t(1, ...))
   #
   # End of fifth test.
   #
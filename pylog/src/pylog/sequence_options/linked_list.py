@@ -1,7 +1,7 @@
 from __future__ import annotations
 from typing import Any, List, Optional, Tuple, Union
 
-from ..logic_variables import ensure_is_logic_variable, euc, PyValue, n_Vars, Term, unify, unify_pairs, Var
+from ..logic_variables import cycle_safe, ensure_is_logic_variable, euc, PyValue, n_Vars, Term, unify, unify_pairs, Var
 from ..sequence_options.super_sequence import is_a_subsequence_of,  member, SuperSequence
 
 
@@ -16,6 +16,9 @@ class LinkedList(SuperSequence):
   When used as a constructor, the argument must be either a Python list or a (Head, Tail) tuple.
   In the second case, Tail must be a LinkedList or a Var.
   """
+
+  __slots__ = ( )
+
   def __init__(self, list_or_tuple: Union[list, str, Term, tuple], tail: Optional[Term] = None ):
     # args will either have two elements or none -- if we are creating an empty list.
     if tail is None:
@@ -48,10 +51,14 @@ class LinkedList(SuperSequence):
   def __len__(self):
     return len(self.to_python_list())
 
+  @cycle_safe(lambda _: '[...]')
   def __str__(self):
     (prefix, tail) = self.prefix_and_tail( )
     valuesString = self.values_string(prefix)
-    result = f'[{valuesString}' + (f' | {tail}]' if isinstance(tail, Var) else ']' )
+    # A LinkedList tail means the list is cyclic: it continues with a part of itself.
+    result = f'[{valuesString}' + (f' | {tail}]' if isinstance(tail, Var) else
+                                   ' | ...]' if isinstance(tail, LinkedList) else
+                                   ']' )
     return result
 
   @staticmethod
@@ -65,11 +72,20 @@ class LinkedList(SuperSequence):
     # return ( ) if not pyList else ( Term.ensure_is_logic_variable(pyList[0]), LinkedList(pyList[1:]) )
     return ( ) if not pyList else ( ensure_is_logic_variable(pyList[0]), LinkedList(pyList[1:]) )
 
+  @cycle_safe(lambda self: self)
   def get_py_value(self):
     args_list = self.to_python_list()
     py_value_args = [arg.get_py_value() for arg in args_list]
     return py_value_args
 
+  def py_value_parts(self) -> Optional[List[Term]]:
+    """ The elements, if the list is complete. A list with an uninstantiated tail has no py_value. """
+    (prefix, tail) = self.prefix_and_tail( )
+    return None if isinstance(tail, Var) else prefix
+
+  def py_value_from_parts(self, part_values: List[Any]) -> list:
+    return part_values
+
   def has_contiguous_sublist(self, As: List):
     """ Can As be unified with a segment of this list? """
     # Initially, As is a standard Python list. Make it a LinkedList.
@@ -93,16 +109,21 @@ class LinkedList(SuperSequence):
     return self.args[0]
 
   def prefix_and_tail(self) -> Tuple[List[Term], Any]:
-    """ Get the initial list of objects and either the tail if it is a Var or [] if it is not a Var. """
-    if self.is_empty():
-      return ([], [])
-    else:
-      Tail_EoT = self.tail().unification_chain_end()
-      if isinstance(Tail_EoT, LinkedList):
-        (tail_prefix, Tail_Tail) = Tail_EoT.prefix_and_tail( )
-        return ([self.head()] + tail_prefix, Tail_Tail)
-      else:
-        return ([self.head()], Tail_EoT)
+    """
+    Get the initial list of objects and either the tail if it is a Var or [] if it is not a Var.
+    If the list is cyclic, the tail is the LinkedList at which it starts to repeat.
+    """
+    (prefix, seen, List) = ([], set( ), self)
+    while not List.is_empty():
+      if id(List) in seen:
+        return (prefix, List)
+      seen.add(id(List))
+      prefix.append(List.head())
+      Tail_EoT = List.tail().unification_chain_end()
+      if not isinstance(Tail_EoT, LinkedList):
+        return (prefix, Tail_EoT)
+      List = Tail_EoT
+    return (prefix, [])
 
   def tail(self) -> Union[LinkedList, Var]:
     return self.args[1]
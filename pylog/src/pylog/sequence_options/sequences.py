@@ -1,18 +1,44 @@
 from __future__ import annotations
-from typing import List, Union
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
 
-from ..logic_variables import euc, PyValue, n_Vars, unify, unify_pairs, unify_sequences, Var
+from ..logic_variables import (cycle_safe, ensure_is_logic_variable, euc, ground_key, PyValue, n_Vars, Structure, Term,
+                               unify, unify_pairs, unify_sequences, Var)
 from ..sequence_options.super_sequence import SuperSequence
 
 
+def element_key(Element: Term) -> Optional[Hashable]:
+  """
+  A hashable key for Element (the end of a unification_chain) if it is ground now: two such Elements
+  unify iff their keys are equal. None if it isn't ground. As in unify, a Structure's key is made from
+  its functor and args, not its class: House(('red', 'dog')) and Structure(('house', 'red', 'dog'))
+  have the same key.
+  """
+  if isinstance(Element, PyValue):
+    return Element.get_py_value( )
+  if isinstance(Element, Structure):
+    return ground_key((Element, ))
+  return None
+
+
 class PySequence(SuperSequence):
   """
   Python treats lists and tuples as essentially the same. This is the common core.
   The self.args are the list/tuple elements. Their length is fixed. (This disallows
   appending elements to a list or extending a list.)
+
+  A PySequence may also be a view: tail( ) and slices are PySequences (of the same class) whose
+  elements are self._base[self._start:self._stop], where _base is the args tuple of the PySequence
+  they were taken from. A view is made without copying or converting the elements. So, e.g., scanning
+  a PySequence by repeatedly taking its tail( ) takes linear time. A view's args (and _ground_hash and
+  _open_args) are missing until they are first needed, e.g., by unify. (See __getattr__.)
+  _base is None if this PySequence is not a view.
   """
+
+  __slots__ = ('_base', '_start', '_stop')
+
   def __init__(self, pyType, initialElements: Union[list, set, tuple]):
     super().__init__( (pyType, *initialElements) )
+    self._base = None
 
   def __add__(self, Other: Union[PySequence, Var]) -> PySequence:
     Other_EoT = Other.unification_chain_end()
@@ -25,12 +51,32 @@ class PySequence(SuperSequence):
       assert isinstance(Result_EoT, PySequence)
       return Result_EoT
 
+  def __getattr__(self, name: str):
+    # Called only for missing slots. For a view, make its args, etc., from its _base.
+    if name == 'args':
+      self.args = self._base[self._start:self._stop]
+      return self.args
+    if name == '_ground_hash':
+      self._set_ground_hash( )
+      return self._ground_hash
+    if name == '_open_args':
+      self._open_args = None
+      return None
+    raise AttributeError(name)
+
   def __getitem__(self, key: Union[int, slice]):
-    return self.args[key] if isinstance(key, int) else self.__class__(self.args[key])
+    if self._base is None:
+      if isinstance(key, int):
+        return self.args[key]
+      (base, indices) = (self.args, range(len(self.args)))
+    else:
+      (base, indices) = (self._base, range(self._start, self._stop))
+    return base[indices[key]] if isinstance(key, int) else self.view(base, indices[key])
 
   def __len__(self):
-    return len(self.args)
+    return len(self.args) if self._base is None else self._stop - self._start
 
+  @cycle_safe(lambda _: '...')
   def __str__(self):
     (left, right) = {list: ('[', ']'), set: ('{', '}'), tuple: ('(', ')')}[self.functor]
     values_string = self.values_string(self.args)
@@ -39,9 +85,13 @@ class PySequence(SuperSequence):
     result = f'{left}{values_string}{right}'
     return result
 
+  @cycle_safe(lambda self: self)
   def get_py_value(self) -> tuple:
     return self.functor(arg.get_py_value() for arg in self.args)
 
+  def py_value_from_parts(self, part_values: List[Any]) -> Union[list, set, tuple]:
+    return self.functor(part_values)
+
   def has_contiguous_sublist(self, As: List):
     """ Can As be unified with a contiguous segment of this list? """
     (len_As, len_self) = (len(As), len(self))
@@ -50,43 +100,214 @@ class PySequence(SuperSequence):
     elif len_As > len_self:
       return  # Fail.
     else:
-      for i in range(len_self - len_As + 1):
+      for i in self.feasible_offsets(As):
         # Succeed for each segment of self that can be unified with As.
         # This is the same strategy used in the LinkedList version. Just much more straightforward.
         for _ in unify_sequences(As, self.args[i:i+len_As]):
           yield
 
+  def feasible_offsets(self, As: List) -> Iterator[int]:
+    """
+    The offsets, in increasing order, at which As might be unified with a segment of self. (Assumes
+    len(As) <= len(self).)
+
+    Without ground elements in As, that's every offset. Otherwise, a Rabin-Karp search finds the
+    offsets at which the longest run of ground elements in As lines up with equal elements of self.
+    Each element is represented by a small int: equal ground elements by the same one, elements of self
+    that aren't in the run by NO_MATCH, and uninstantiated elements of self by WILDCARD. A window of
+    self that contains a WILDCARD can't be ruled out this way. So its offset is produced too.
+    """
+    (len_As, n) = (len(As), len(self.args))
+    last_offset = n - len_As
+    keys = [element_key(ensure_is_logic_variable(A).unification_chain_end( )) for A in As]
+    # The longest run of ground elements in As: keys[run_start:run_start+L].
+    (run_start, L, start) = (0, 0, None)
+    for (j, key) in enumerate([*keys, None]):
+      if key is None:
+        if start is not None and j - start > L:
+          (run_start, L) = (start, j - start)
+        start = None
+      elif start is None:
+        start = j
+    if L == 0:
+      yield from range(last_offset + 1)
+      return
+
+    (WILDCARD, NO_MATCH) = (-1, -2)
+    ids = { }
+    run = [ids.setdefault(key, len(ids)) for key in keys[run_start:run_start+L]]
+    text = []
+    for Element in self.args:
+      # Constant PyValues, the usual case, are their own unification_chain ends.
+      key = Element._py_value if isinstance(Element, PyValue) and Element._constant else \
+            element_key(Element.unification_chain_end( ))
+      text.append(WILDCARD if key is None else ids.get(key, NO_MATCH))
+
+    # Hash windows of L elements as base-B numbers mod M. WILDCARDs count as 0.
+    (B, M) = (1 << 20, (1 << 61) - 1)
+    digits = [0 if v == WILDCARD else v + 3 for v in text]
+    top = pow(B, L - 1, M)
+    (target, h, wildcards) = (0, 0, 0)
+    for (k, v) in enumerate(run):
+      target = (target * B + v + 3) % M
+      h = (h * B + digits[run_start + k]) % M
+      wildcards += text[run_start + k] == WILDCARD
+    # The window starting at s lines up with the run if As starts at offset s - run_start.
+    for s in range(run_start, last_offset + run_start + 1):
+      if wildcards or h == target and text[s:s+L] == run:
+        yield s - run_start
+      if s + L < n:
+        h = ((h - digits[s] * top) * B + digits[s + L]) % M
+        wildcards += (text[s + L] == WILDCARD) - (text[s] == WILDCARD)
+
+  def has_member(self, E: Term):
+    """
+    Unify E with each element in turn, in order--in one frame, by looping over the elements rather than
+    recursing on the tail. Skips, without trying to unify, the elements that can't unify with E: a
+    PyValue and a Structure never unify; two PyValues with different values don't; nor do two
+    Structures with different functors or lengths, or two ground Structures with different hashes.
+    """
+    E = ensure_is_logic_variable(E).unification_chain_end( )
+    (base, indices) = (self.args, range(len(self.args))) if self._base is None else \
+                      (self._base, range(self._start, self._stop))
+    if isinstance(E, PyValue):
+      value = E.get_py_value( )
+      for i in indices:
+        Arg = base[i]
+        if isinstance(Arg, Structure) or \
+           value is not None and isinstance(Arg, PyValue) and Arg._constant and Arg._py_value != value:
+          continue
+        yield from unify(E, Arg)
+    elif isinstance(E, Structure):
+      (functor, length, ground_hash) = (E.functor, len(E.args), E._ground_hash)
+      for i in indices:
+        Arg = base[i]
+        if isinstance(Arg, PyValue) or \
+           isinstance(Arg, Structure) and (Arg.functor != functor or len(Arg.args) != length or
+                                           ground_hash is not None and Arg._ground_hash is not None and
+                                           Arg._ground_hash != ground_hash):
+          continue
+        yield from unify(E, Arg)
+    else:
+      for i in indices:
+        yield from unify(E, base[i])
+
   def head(self):
     return self[0]
 
+  def is_empty(self) -> bool:
+    return len(self) == 0
+
   def tail(self) -> PySequence:
-    return self.__class__(self.args[1:])
+    return self[1:]
 
   def to_python_list(self) -> list:
-    return [*self.args]
+    return [*self.args] if self._base is None else [*self._base[self._start:self._stop]]
+
+  def with_args(self, args: Iterable[Any]) -> PySequence:
+    new = super( ).with_args(args)
+    new._base = None
+    return new
+
+  def view(self, base: tuple, indices: range) -> PySequence:
+    """ A PySequence of this class whose elements are base[i] for i in indices--a view if possible. """
+    if indices.step != 1:
+      return self.__class__([base[i] for i in indices])
+    view = self.__class__.__new__(self.__class__)
+    view._term_id = None
+    view.functor = self.functor
+    (view._base, view._start, view._stop) = (base, indices.start, max(indices.start, indices.stop))
+    return view
 
 
 class PyList(PySequence):
+  __slots__ = ( )
+
   def __init__(self, initialElements: list):
     super().__init__( list, initialElements )
 
 
 class PyTuple(PySequence):
+  __slots__ = ( )
+
   def __init__(self, initialElements: tuple):
     super( ).__init__( tuple, initialElements )
 
 
 class PySet(PySequence):
+  """
+  A PySequence whose elements are kept in the order given, but without duplicate ground elements.
+  The ground elements--constant PyValues and ground Structures--are also indexed: _ground maps the
+  element_key of each one to it. So looking up a ground element, discarding it, and len( ) take
+  constant time. The other elements (Vars, etc.) are in _open. PySets unify like other PySequences,
+  element by element.
+
+  A PySet made by discard( ) has no args until they are needed; a view has no _ground or _open. Each
+  is made from the other when first needed. (See __getattr__.)
+  """
+  __slots__ = ('_ground', '_open')
+
   def __init__(self, initialElements: Union[list, set, tuple]):
-    """ Doesn't check to see whether initialElements is really a set. """
-    super( ).__init__( set, tuple(initialElements) )
+    (ground, open_elements, elements) = PySet.index_elements(map(ensure_is_logic_variable, initialElements))
+    super( ).__init__( set, elements )
+    (self._ground, self._open) = (ground, open_elements)
+
+  def __getattr__(self, name: str):
+    if name == 'args' and self._base is None:
+      self.args = (*self._ground.values( ), *self._open)
+      return self.args
+    if name in ('_ground', '_open'):
+      (self._ground, self._open, _) = PySet.index_elements(self.args)
+      return getattr(self, name)
+    return super( ).__getattr__(name)
+
+  def __len__(self):
+    return len(self._ground) + len(self._open) if self._base is None else self._stop - self._start
 
   def discard(self, Other: PyValue) -> PySet:
     Other_EoT = Other.unification_chain_end()
-    new_args = [arg for arg in self.args if arg != Other_EoT]
-    new_set = PySet(new_args)
+    key = element_key(Other_EoT)
+    if key is None or self._open:
+      new_args = [arg for arg in self.args if arg != Other_EoT]
+      new_set = PySet(new_args)
+      return new_set
+    if key not in self._ground:
+      return self
+    ground = dict(self._ground)
+    del ground[key]
+    new_set = PySet.__new__(PySet)
+    (new_set._term_id, new_set.functor, new_set._base) = (None, set, None)
+    (new_set._ground, new_set._open) = (ground, ( ))
     return new_set
 
+  def has_member(self, E: Term):
+    E = ensure_is_logic_variable(E).unification_chain_end( )
+    key = None if self._open else element_key(E)
+    if key is None:
+      yield from super( ).has_member(E)
+    elif key in self._ground:
+      # E unifies with the one ground element equal to it, without binding anything.
+      yield
+
+  @staticmethod
+  def index_elements(Elements: Iterable[Term]) -> Tuple[Dict[Hashable, Term], Tuple[Term, ...], List[Term]]:
+    """ (ground, open, elements): the ground elements by key, the others, and all of them without duplicates. """
+    (ground, open_elements, elements) = ({ }, [], [])
+    for Element in Elements:
+      if isinstance(Element, PyValue) and Element._constant or \
+         isinstance(Element, Structure) and Element._ground_hash is not None:
+        key = element_key(Element)
+        if key in ground:
+          continue
+        ground[key] = Element
+      else:
+        open_elements.append(Element)
+      elements.append(Element)
+    return (ground, tuple(open_elements), elements)
+
+  def with_args(self, args: Iterable[Any]) -> PySet:
+    return PySet(args)
+
 
 @euc
 def append(Xs: Union[PySequence, Var], Ys: Union[PySequence, Var], Zs: Union[PySequence, Var]):
@@ -104,30 +325,25 @@ def append(Xs: Union[PySequence, Var], Ys: Union[PySequence, Var], Zs: Union[PyS
       return
 
   if isinstance(Zs, Var):
-    ListType = type(Xs)
-    # Make Zs a list of Var's of length len(Xs) + len(Ys)
-    # After this unification, Zs will still be a Var, but
-    # by the time we reach this point again, Zs will refer
-    # to its trail end, which is not a Var.
-    for _ in unify(Zs, ListType(n_Vars(len(Xs) + len(Ys)))):
-      yield from append(Xs, Ys, Zs)
+    # Zs is the concatenation of Xs and Ys, which must be sequences of the same type.
+    if type(Xs) is type(Ys):
+      yield from unify(Zs, type(Xs)([*Xs.args, *Ys.args]))
     return
 
   # We now know that: Zs is not a Var -- although it may be a sequence of Vars.
-  # Divide up its length among Xs and Ys
-  ListType = type(Zs)
+  # Divide up its length among Xs and Ys. Xs and Ys are unified with views of Zs (see PySequence),
+  # which share its args rather than copy them. If Xs or Ys is already a sequence, its length
+  # determines the only split that could succeed.
   len_Zs = len(Zs)
-  for i in range(len_Zs + 1):
-    # If Xs or Ys are already instantiated to some fixed length Sequence, unify will fail when given the wrong length.
-    for _ in unify_pairs([ (Xs, ListType(n_Vars(i))),
-                           (Ys, ListType(n_Vars(len_Zs - i)))  ]):
-      # Although the lengths of Xs and Ys vary with i,
-      # Xs, Ys, and Zs are all of fixed lengths in which len(Xs) + len(Ys) = len(Zs).
-      # Concatenate Xs and Ys and then unify the concatenation with Zs.
-      XYs = [*Xs.unification_chain_end().args, *Ys.unification_chain_end().args]
-      yield from unify_sequences(XYs, Zs.args)
-      # for _ in unify_sequences(XYs, Zs.args):
-      #   yield
+  if isinstance(Xs, PySequence):
+    splits = [len(Xs)] if len(Xs) <= len_Zs else []
+  elif isinstance(Ys, PySequence):
+    splits = [len_Zs - len(Ys)] if len(Ys) <= len_Zs else []
+  else:
+    splits = range(len_Zs + 1)
+  for i in splits:
+    # If Xs or Ys is of a different type, unify will fail.
+    yield from unify_pairs([(Xs, Zs[:i]), (Ys, Zs[i:])])
 
 
 if __name__ == '__main__':
@@ -11,6 +11,8 @@ class SuperSequence(Structure):
   Declares a number of abstract methods.
   """
 
+  __slots__ = ( )
+
   def __getitem__(self, key: Union[int, slice]) -> Union[SuperSequence, Term]:
       pass
 
@@ -20,6 +22,35 @@ class SuperSequence(Structure):
   def has_contiguous_sublist(self, As):
     pass
 
+  def has_member(self, E: Term):
+    """
+    Unify E with each element in turn: the work of member(E, self). This is the general, Prolog-style
+    version, one recursion level per element. Subclasses may do better.
+    """
+    # If self is empty, it can't have a member. So fail.
+    if self.is_empty():
+      return
+
+    # The following is an implicit 'or'. Either unify E with self.head() or call member(E, self.tail()).
+
+    # The first case is easy.
+    yield from unify(E, self.head( ))
+
+    # The second case--member(E, self.tail())--is trickier.
+    # Since self may be an open-ended LinkedList, self.tail() may be a Var.
+    # In that case, we must first instantiate self.tail() to LinkedList( (Var, Var) ).
+    Tail = self.tail()
+    # Create New_Tail to be unified with Tail.
+    # New_Tail will be Tail in most cases.
+    # But if isinstance(Tail, Var), make New_Tail = LinkedList( (Var( ), Var( )) ).
+    # In either case, unify Tail with New_Tail and call member(E, New_Tail).
+    # An issue is that we can't import LinkedList since that would create an import cycle.
+    # Instead use type(self), which will be LinkedList if Tail is a Var.
+    New_Tail = type(self)((Var( ), Var( ))) if isinstance(Tail, Var) else Tail
+    # If New_Tail is Tail, this unify does nothing.
+    for _ in unify(New_Tail, Tail):
+      yield from member(E, New_Tail)
+
   def head(self) -> Term:
     pass
 
@@ -74,42 +105,14 @@ def member(E: Term, A_List: Union[List, SuperSequence, Var]):
   # if isinstance(A_List, list):
   #   yield from member_python_list(E, A_List)
   #
-  # # If A_List is empty, it can't have a member. So fail.
-  if A_List.is_empty():
-    return
-
-  # The following is an implicit 'or'. Either unify E with A_List.head() or call member(E, A_List.tail()).
-
-  # The first case is easy.
-  # for _ in unify(E, A_List.head( )):
-  #   yield
-  yield from unify(E, A_List.head( ))
-
-  # The second case--member(E, A_List.tail())--is trickier.
-  # Since A_List may be an open-ended LinkedList, A_List.tail() may be a Var.
-  # In that case, we must first instantiate A_List.tail() to LinkedList( (Var, Var) ).
-  A_List_Tail = A_List.tail()
-  # Create A_List_New_Tail to be unified with A_List_Tail.
-  # A_List_New_Tail will be A_List_Tail in most cases.
-  # But if isinstance(A_List_Tail, Var), make A_List_New_Tail = LinkedList( (Var( ), Var( )) ).
-  # In either case, unify A_List_Tail with A_List_New_Tail and call member(E, A_List_New_Tail).
-  # An issue is that we can't import LinkedList since that would create an import cycle.
-  # Instead use type(A_List), which will be LinkedList if A_List_Tail is a Var.
-  A_List_New_Tail = type(A_List)((Var( ), Var( ))) if isinstance(A_List_Tail, Var) else A_List_Tail
-  # If A_List_New_Tail is A_List_Tail, this unify does nothing.
-  for _ in unify(A_List_New_Tail, A_List_Tail):
-    yield from member(E, A_List_New_Tail)
+  yield from A_List.has_member(E)
 
 
 @euc
 def members(Es: List, A_List: SuperSequence):
   """ Do all elements of es appear in A_List (in any order). """
-  # No more to look up. We're done.
-  if not Es:
-    yield
-  else:
-    for _ in member(Es[0], A_List):
-      yield from members(Es[1:], A_List)
+  # A conjunction of member goals. forall runs it without recursing once per element of Es.
+  yield from forall([lambda E=E: member(E, A_List) for E in Es])
 
 
 def next_to(E1: Term, E2: Term, Es: SuperSequence):
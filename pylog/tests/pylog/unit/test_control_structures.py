@@ -0,0 +1,455 @@
+import asyncio
+import gc
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import get_context
+from time import perf_counter
+
+from pylog.control_structures import (all_call_caches, bool_yield_wrapper, Budget, CallCache, Cut, depth_bounded,
+                                      depth_counted, fails, first_n, forall, geometric, invalidate_tables,
+                                      iterative_deepening, luby, once, parallel_forany, profiled, profiler, restarts,
+                                      search_baton, solutions, tabled, Trace, would_succeed)
+from pylog.fact_table import FactTable
+from pylog.logic_variables import FDVar, label, n_Vars, PyValue, Structure, trail, Trail, unify, unify_pairs, Var
+from pylog.sequence_options.linked_list import LinkedList
+from pylog.sequence_options.sequences import append, PyList
+from pylog.sequence_options.super_sequence import member
+
+
+def digit_pairs(X, Y):
+    for i in range(3):
+        for j in range(3):
+            yield from unify_pairs([(X, i), (Y, j)])
+
+
+def test_solutions_snapshots_the_template():
+    (X, Y) = n_Vars(2)
+    assert list(solutions(digit_pairs(X, Y), [X, Y], limit=4)) == [(0, 0), (0, 1), (0, 2), (1, 0)]
+    assert list(solutions(lambda: digit_pairs(X, Y), X, offset=7)) == [2, 2]
+    assert list(solutions(digit_pairs(X, Y), (X, Y), limit=2, offset=3)) == [(1, 0), (1, 1)]
+    assert not X.is_instantiated() and not Y.is_instantiated()
+
+
+def test_solutions_resolves_like_get_py_value():
+    (X, Y, Z, T) = n_Vars(4)
+    S = Structure(('f', X, Structure(('g', X, Y))))
+    Terms = [X, Y, S, PyList([X, Z]), LinkedList([X, 'a']), LinkedList((X, T))]
+    # Uninstantiated PyValues are never equal. So compare the strings.
+    for _ in unify_pairs([(X, 1), (Z, S)]):
+        assert list(map(str, next(solutions([None], Terms)))) == \
+               [str(Term.get_py_value()) for Term in Terms[:4]] + ["[1, 'a']", 'None']
+    assert list(map(str, next(solutions([None], [Z, S])))) == ['None', str(S.get_py_value())]
+
+
+def test_solutions_closes_the_goal_at_the_limit():
+    (X, Y) = n_Vars(2)
+    mark = trail.mark()
+    gen = digit_pairs(X, Y)
+    assert list(solutions(gen, X, limit=1)) == [0]
+    assert gen.gi_frame is None
+    assert trail.mark() == mark and not X.is_instantiated()
+    # A plain iterable works as a goal, too. Stopping early also closes the goal and undoes its bindings.
+    assert list(solutions([None], X, limit=1)) == [None]
+    gen = digit_pairs(X, Y)
+    for _ in islice(solutions(gen, X), 1):
+        pass
+    assert gen.gi_frame is None and trail.mark() == mark and not X.is_instantiated()
+    # Solutions are snapshots of long or deep terms alike.
+    Xs = n_Vars(5000)
+    Deep = Structure(('leaf', Xs[0]))
+    for _ in range(5000):
+        Deep = Structure(('s', Deep))
+    for _ in unify(Xs[0], PyValue(0)):
+        assert list(solutions(unify(PyList(Xs), PyList(range(5000))), PyList(Xs))) == [list(range(5000))]
+        Deep_value = next(solutions([None], Deep))
+        for _ in range(5000):
+            Deep_value = Deep_value.args[0]
+        assert str(Deep_value) == 'leaf(0)'
+
+
+def test_forall_backtracks_like_nested_loops():
+    (X, Y) = n_Vars(2)
+    gens = [lambda: digit_pairs(X, Y), lambda: unify(X, Y), lambda: iter([1, 2])]
+    assert [(X.get_py_value(), Y.get_py_value()) for _ in forall(gens)] == \
+           [(0, 0), (0, 0), (1, 1), (1, 1), (2, 2), (2, 2)]
+    assert list(forall([])) == [None] and list(forall(gens + [lambda: iter([])])) == []
+    # A long conjunction runs without deep recursion.
+    Xs = n_Vars(20000)
+    gens = [lambda X=X, i=i: unify(X, i) for (i, X) in enumerate(Xs)]
+    assert [Xs[-1].get_py_value() for _ in forall(gens)] == [19999]
+
+
+def test_parallel_forany():
+    (X, Y, Z) = n_Vars(3)
+    alternatives = [(digit_pairs, X, Y), (digit_pairs, Y, Z)]
+    for _ in unify(Y, 2):
+        # Each alternative sees the binding of Y. Only the template's bindings come back.
+        assert [(X.get_py_value(), Z.get_py_value()) for _ in parallel_forany(alternatives, [X, Z])] == \
+               [(0, None), (1, None), (2, None), (None, 0), (None, 1), (None, 2)]
+        assert len(list(parallel_forany(alternatives, X, ordered=False))) == 6
+    assert not X.is_instantiated()
+
+
+def same_as_f_a(S, X):
+    # f(a) is built in the worker process, where hash('a') differs.
+    yield from unify_pairs([(S, Structure(('f', 'a'))), (X, S)])
+
+
+def test_parallel_forany_with_spawned_workers():
+    X = Var()
+    with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as executor:
+        # Ground Structures are rehashed when unpickled, in the worker and back here.
+        assert [X.get_py_value() == Structure(('f', 'a'))
+                for _ in parallel_forany([(same_as_f_a, Structure(('f', 'a')), X)], X, executor=executor)] == [True]
+
+
+def once_then_spin(X):
+    yield from unify(X, 0)
+    while True:
+        pass
+
+
+def test_parallel_forany_streams_and_stops_promptly():
+    X = Var()
+    # counting never finishes. Its successes arrive as they are found.
+    assert [X.get_py_value() for _ in islice(parallel_forany([(counting, X)], X), 3)] == [0, 1, 2]
+    assert not X.is_instantiated()
+    start = perf_counter()
+    gen = parallel_forany([(once_then_spin, X), (counting, X)], X)
+    next(gen)
+    assert X.get_py_value() == 0
+    # Closing it doesn't wait for the alternatives that are still running.
+    gen.close()
+    assert perf_counter() - start < 2 and not X.is_instantiated()
+
+
+def test_once_and_first_n_close_and_undo():
+    (X, Y) = n_Vars(2)
+    mark = trail.mark()
+    gen = digit_pairs(X, Y)
+    assert [(X.get_py_value(), Y.get_py_value()) for _ in first_n(2, gen)] == [(0, 0), (0, 1)]
+    assert gen.gi_frame is None and trail.mark() == mark
+    for _ in once(lambda: digit_pairs(X, Y)):
+        assert (X.get_py_value(), Y.get_py_value()) == (0, 0)
+        break
+    # Abandoning once( ) closes it, which undoes its bindings.
+    assert not X.is_instantiated() and trail.mark() == mark
+
+
+def test_cut():
+    (X, Y) = n_Vars(2)
+
+    def p(X, Y):
+        cut = Cut()
+        yield from cut.alternatives([lambda: forall([lambda: unify(X, Y), lambda: digit_pairs(X, Y), cut,
+                                                     lambda: iter([1, 2])]),
+                                     lambda: unify(X, 'c')])
+
+    # The cut commits to the first solution of the goals before it, but not of those after it.
+    assert [(X.get_py_value(), Y.get_py_value()) for _ in p(X, Y)] == [(0, 0), (0, 0)]
+    # Without reaching the cut, the second alternative is tried.
+    assert [X.get_py_value() for _ in p(X, 5)] == ['c']
+    assert not X.is_instantiated()
+
+
+def test_bool_yield_wrapper_undoes_on_exit():
+    (X, Y) = n_Vars(2)
+    mark = trail.mark()
+    with bool_yield_wrapper(digit_pairs)(X, Y) as gen:
+        assert gen.has_more() and gen.has_more()
+        assert (X.get_py_value(), Y.get_py_value()) == (0, 1)
+    assert gen.gi_frame is None if hasattr(gen, 'gi_frame') else gen.gen.gi_frame is None
+    assert not X.is_instantiated() and trail.mark() == mark
+
+
+def test_bool_yield_wrapper_async():
+    order = []
+
+    def busy(name, X, n):
+        # n inference steps before the first success.
+        for i in range(n):
+            for _ in unify(X, i):
+                pass
+        order.append(name)
+        yield from unify(X, n)
+
+    async def search(name, n):
+        X = n_Vars(1)[0]
+        async with bool_yield_wrapper(busy)(name, X, n) as gen:
+            gen.async_steps = 10
+            return [X.get_py_value() async for _ in gen]
+
+    async def searches():
+        return await asyncio.gather(search('long', 20000), search('short', 30))
+
+    assert asyncio.run(searches()) == [[20000], [30]]
+    # The long search, which started first, gave the short one turns.
+    assert order == ['short', 'long']
+
+
+def test_bool_yield_wrapper_async_cancel():
+    X = Var()
+    mark = trail.mark()
+
+    def spin(X, n):
+        # Never succeeds (in any reasonable time).
+        for i in range(n):
+            for _ in unify(X, i):
+                pass
+        yield
+
+    async def search():
+        async with bool_yield_wrapper(spin)(X, 5_000_000) as gen:
+            gen.async_steps = 10
+            async for _ in gen:
+                pass
+
+    async def cancel():
+        task = asyncio.create_task(search())
+        await asyncio.sleep(0.2)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return 'cancelled'
+
+    # The search was stopped in its own thread, and closed there, before the task finished.
+    assert asyncio.run(cancel()) == 'cancelled'
+    assert not X.is_instantiated() and trail.mark() == mark and not search_baton.locked()
+
+
+def test_bool_yield_wrapper_async_bindings_seen_from_outside():
+    (X, Y) = n_Vars(2)
+    mark = trail.mark()
+
+    def a_or_b(Y):
+        for v in 'ab':
+            yield from unify(Y, v)
+
+    async def search():
+        async with bool_yield_wrapper(a_or_b)(Y) as gen:
+            return [(str(X), str(Y)) async for _ in gen]
+
+    # Looking at X from the event loop's thread doesn't leave a binding the search can't undo.
+    for _ in unify(X, Y):
+        assert asyncio.run(search()) == [('a', 'a'), ('b', 'b')]
+        assert not X.is_instantiated() and not Y.is_instantiated()
+    assert type(trail) is Trail and trail.mark() == mark
+
+
+def test_bool_yield_wrapper_undoes_only_its_own_bindings():
+    (Xs, Ys, X) = n_Vars(3)
+    gen = bool_yield_wrapper(append)(Xs, Ys, PyList([1, 2]))
+    # X is bound after gen is made, but before it is used.
+    for _ in unify(X, 'outer'):
+        with gen:
+            splits = 0
+            while gen.has_more():
+                splits += 1
+        assert splits == 3 and X.get_py_value() == 'outer' and not Xs.is_instantiated()
+
+
+@profiled
+def digit(X):
+    for i in range(3):
+        yield from unify(X, i)
+
+
+@profiled
+def two_digits(X, Y):
+    for _ in digit(X):
+        yield from digit(Y)
+
+
+def test_profiler():
+    (X, Y) = n_Vars(2)
+    assert len(list(two_digits(X, Y))) == 9 and profiler.stats == {}
+    with profiler:
+        assert len(list(two_digits(X, Y))) == 9
+    assert len(list(two_digits(X, Y))) == 9
+    (calls, exits, redos, fails, seconds, inferences) = profiler.stats['digit']
+    assert (calls, exits, redos, fails, inferences) == (4, 12, 12, 4, 12)
+    assert profiler.stats['two_digits'][:4] == [1, 9, 9, 1] and 0 < seconds < profiler.stats['two_digits'][4]
+    assert list(profiler.events)[:3] == [('call', 'two_digits', 0), ('call', 'digit', 1), ('exit', 'digit', 1)]
+    stacks = dict(line.rsplit(' ', 1) for line in profiler.collapsed_stacks().split('\n'))
+    assert set(stacks) == {'two_digits', 'two_digits;digit'}
+    assert profiler.report().split('\n')[1].startswith('two_digits')
+    profiler.reset()
+
+
+@Trace
+def traced_digit(tag, X):
+    yield from digit(X)
+
+
+def test_trace_prints_only_when_on_and_records_in_profiler(capsys):
+    X = Var()
+    assert len(list(traced_digit('d', X))) == 3 and capsys.readouterr().out == f'tag: d, X: {X}\n'
+    Trace.trace = False
+    try:
+        with profiler:
+            assert len(list(traced_digit('d', X))) == 3
+    finally:
+        Trace.trace = True
+    assert capsys.readouterr().out == '' and profiler.stats['traced_digit'][:4] == [1, 3, 3, 1]
+    assert 'traced_digit;digit' in profiler.collapsed_stacks()
+    profiler.reset()
+
+
+def test_tabled_left_recursion():
+    edge = FactTable(2, [(1, 2), (2, 3), (3, 1), (3, 4)])
+    calls = []
+
+    @tabled(depends_on=[edge])
+    def path(X, Z):
+        calls.append(X)
+        Y = Var()
+        # Left recursive: would loop forever without tabling.
+        for _ in path(X, Y):
+            yield from edge(Y, Z)
+        yield from edge(X, Z)
+
+    (X, Z) = n_Vars(2)
+    assert sorted(Z.get_py_value() for _ in path(1, Z)) == [1, 2, 3, 4]
+    # The second call of the same variant replays the table.
+    call_count = len(calls)
+    assert sorted(Z.get_py_value() for _ in path(1, Z)) == [1, 2, 3, 4] and len(calls) == call_count
+    assert len([_ for _ in path(X, Z)]) == 12 and not X.is_instantiated()
+    # Changing the fact table discards the tables.
+    edge.add((4, 5))
+    assert sorted(Z.get_py_value() for _ in path(1, Z)) == [1, 2, 3, 4, 5] and len(calls) > call_count
+
+
+def test_tabled_evicts_least_recently_used():
+    calls = []
+
+    @tabled(max_tables=2)
+    def square(X, Y):
+        calls.append(X.get_py_value())
+        yield from unify(Y, X.get_py_value() ** 2)
+
+    Y = Var()
+    for x in [1, 2, 1, 3, 1, 2]:
+        assert [Y.get_py_value() for _ in square(PyValue(x), Y)] == [x * x]
+    assert calls == [1, 2, 3, 2]
+    square.invalidate()
+    assert [Y.get_py_value() for _ in square(PyValue(1), Y)] == [1] and calls[-1] == 1
+
+
+def counting(X):
+    i = 0
+    while True:
+        yield from unify(X, i)
+        i += 1
+
+
+def test_budgets_abort_and_undo():
+    X = Var()
+    mark = trail.mark()
+    budget = Budget(steps=50)
+    assert len(list(budget.run(counting(X)))) == 49 and budget.exhausted
+    assert trail.mark() == mark
+    # An enclosing budget's exhaustion aborts the inner run too.
+    (outer, inner) = (Budget(steps=30), Budget(steps=100))
+    assert len(list(outer.run(lambda: inner.run(counting(X))))) == 29
+    assert outer.exhausted and not inner.exhausted
+    budget = Budget(seconds=0.01, check_every=10)
+    assert len(list(budget.run(counting(X)))) > 0 and budget.exhausted
+    budget = Budget(steps=50)
+    assert len(list(budget.run(digit_pairs(X, Var())))) == 9 and not budget.exhausted
+
+
+def test_restarts():
+    assert list(islice(luby(1), 15)) == [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8]
+    assert list(islice(geometric(10, 1.5), 4)) == [10, 15, 22, 34]
+    runs = []
+
+    def needle(rng):
+        # Succeeds only after a long search, so it succeeds only once the budget is big enough.
+        runs.append(rng.random())
+        X = Var()
+        for _ in counting(X):
+            if X.get_py_value() == 40:
+                yield X.get_py_value()
+                return
+
+    assert list(restarts(needle, geometric(8, 2), seed=1)) == [40] and len(runs) == 4
+    Xs = [FDVar(range(3)) for _ in range(3)]
+    # Randomized labeling finds the same solutions, though not necessarily in the same order.
+    assert sorted(tuple(X.get_py_value() for X in Xs) for _ in restarts(lambda rng: label(Xs, rng), luby())) == \
+           sorted(tuple(X.get_py_value() for X in Xs) for _ in label(Xs))
+
+
+edges = {'a': ['a', 'b'], 'b': ['a', 'c'], 'c': []}
+
+
+@depth_counted
+def path(X, Y, Path):
+    # Depth-first search would never get out of the loop a -> a -> a -> ...
+    for Z in edges[X.get_py_value()]:
+        if Z == Y.get_py_value():
+            yield from unify(Path, (Z, ))
+        Rest = Var()
+        for _ in path(PyValue(Z), Y, Rest):
+            yield from unify(Path, (Z, *Rest.get_py_value()))
+
+
+def test_depth_bounded_and_iterative_deepening():
+    (A, C, Path) = (PyValue('a'), PyValue('c'), Var())
+    assert list(solutions(depth_bounded(lambda: path(A, C, Path), 2), Path)) == [('b', 'c')]
+    assert list(solutions(depth_bounded(lambda: path(A, C, Path), 1), Path)) == []
+    assert list(solutions(iterative_deepening(lambda: path(A, C, Path)), Path, limit=1)) == [('b', 'c')]
+    # Carrying the solutions forward yields each one once, in order of depth.
+    assert list(solutions(iterative_deepening(lambda: path(A, C, Path), 4, template=Path), Path)) == \
+           [('b', 'c'), ('a', 'b', 'c'), ('a', 'a', 'b', 'c'), ('b', 'a', 'b', 'c')]
+    assert len(list(iterative_deepening(lambda: path(A, C, Path), 4))) == 0 + 1 + 2 + 4
+    assert len(list(iterative_deepening(lambda: path(A, C, Path), shallowest=True))) == 1
+    # A search that isn't cut off by its bound ends the deepening.
+    assert list(iterative_deepening(lambda: path(C, A, Path))) == []
+
+
+def test_call_cache():
+    facts = FactTable(1, [(1, ), (2, )])
+    cache = CallCache(max_size=2, depends_on=[facts])
+    calls = []
+
+    def fact(X):
+        calls.append(X.get_py_value())
+        yield from facts(X)
+
+    X = Var()
+    for x in [1, 3, 1, 3, 2, 1]:
+        assert [x for _ in unify(X, x) for _ in fails(fact, cache)(X)] == ([] if x < 3 else [x])
+    # Only the two most recent outcomes are kept.
+    assert calls == [1, 3, 2, 1]
+    # Non-ground calls run each time and leave no bindings.
+    assert [X.is_instantiated() for _ in would_succeed(fact, cache)(X)] == [False] and calls[-1] is None
+    facts.add((3, ))
+    assert list(would_succeed(fact, cache)(PyValue(3))) == [None] and calls[-1] == 3
+
+
+def test_call_cache_keys_and_registration():
+    calls = []
+
+    def has(X, Xs):
+        calls.append(len(Xs))
+        yield from member(X, Xs)
+
+    cache = CallCache()
+    Long = PyList(range(100000))
+    # Ground Structures are keyed by their hashes, and compared on a hit.
+    for Xs in [Long, Long, PyList(range(100000)), PyList(range(1, 100001))]:
+        assert list(fails(has, cache)(PyValue(0), Xs)) == ([] if Xs.args[0] == PyValue(0) else [None])
+    assert calls == [100000, 100000]
+    # Structures that contain Vars aren't cached.
+    X = Var()
+    for _ in range(2):
+        assert list(would_succeed(has, cache)(1, PyList([X, 1]))) == [None]
+    assert calls[2:] == [2, 2]
+    # invalidate_tables( ) clears the caches in use. A cache no longer in use isn't kept.
+    invalidate_tables()
+    assert not cache.outcomes and cache in all_call_caches
+    n_caches = len(all_call_caches)
+    del cache
+    gc.collect()
+    assert len(all_call_caches) == n_caches - 1
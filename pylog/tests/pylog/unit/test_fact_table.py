@@ -0,0 +1,30 @@
+from pylog.fact_table import FactTable
+from pylog.logic_variables import n_Vars, PyValue, Structure, trail, unify
+
+
+def test_fact_table_queries():
+    parent = FactTable(2, [('tom', 'bob'), ('tom', 'liz'), ('bob', 'ann'), ('bob', 'pat'), ('pat', 'jim')])
+    (X, Y) = n_Vars(2)
+    mark = trail.mark()
+    assert [Y.get_py_value() for _ in parent('bob', Y)] == ['ann', 'pat']
+    assert [(X.get_py_value(), Y.get_py_value()) for _ in parent(X, Y)][-2:] == [('bob', 'pat'), ('pat', 'jim')]
+    # Grandparents, with one variable shared between the two calls.
+    assert [Y.get_py_value() for _ in parent('tom', X) for _ in parent(X, Y)] == ['ann', 'pat']
+    assert [_ for _ in parent(PyValue('tom'), 'liz')] == [None] and list(parent('liz', X)) == []
+    assert trail.mark() == mark and not X.is_instantiated()
+
+
+def test_fact_table_updates():
+    edges = FactTable(3, ((i, i + 1, i % 3) for i in range(100000)))
+    (A, B) = n_Vars(2)
+    assert [A.get_py_value() for _ in edges(A, 50000, B)] == [49999]
+    # The index on the second column is kept up to date.
+    edges.add((7, 50000, 1))
+    assert (7, 50000, 1) in edges and len(edges) == 100001
+    assert [(A.get_py_value(), B.get_py_value()) for _ in edges(A, 50000, B)] == [(49999, 1), (7, 1)]
+    edges.remove((49999, 50000, 1))
+    assert [A.get_py_value() for _ in edges(A, 50000, 1)] == [7]
+    # Structures and bound Vars are unified with the facts' values.
+    for _ in unify(B, 2):
+        assert [A.get_py_value() for _ in edges(Structure(('f', 1)), A, B)] == []
+        assert len([_ for _ in edges(A, 6, B)]) == 1
@@ -0,0 +1,191 @@
+import pylog.logic_variables as logic_variables
+from pylog.logic_variables import (all_different, copy_terms, domain_of, euc, FDVar, label, not_equal, PyValue, Structure,
+                                   n_Vars, sum_equals, trail, unify, unify_pairs, unify_sequences, variant_key)
+from pylog.sequence_options.linked_list import LinkedList
+
+
+def test_unify_binds_and_undoes():
+    (A, B) = n_Vars(2)
+    mark = trail.mark()
+    for _ in unify(A, B):
+        for _ in unify(B, 'abc'):
+            assert A.get_py_value() == 'abc'
+        assert not A.is_instantiated()
+        assert A == B
+    assert A != B
+    assert trail.mark() == mark
+
+
+def test_failed_unify_leaves_no_bindings():
+    (X, Y) = n_Vars(2)
+    mark = trail.mark()
+    # X is bound to 1 before the last args fail to unify.
+    for _ in unify(Structure(('t', X, Y, 2)), Structure(('t', 1, Y, 3))):
+        assert False
+    assert not X.is_instantiated()
+    assert trail.mark() == mark
+
+
+def test_unify_shares_variables():
+    (V1, V2, V3) = n_Vars(3)
+    solutions = [(V1.get_py_value(), V2.get_py_value(), V3.get_py_value())
+                 for _ in unify(Structure(('t', 1, V1, V1)), Structure(('t', V2, V2, V3)))]
+    assert solutions == [(1, 1, 1)]
+    PV = PyValue()
+    assert [PV.get_py_value() for _ in unify_pairs([(PV, 5), (PV, 5)])] == [5]
+    assert not PV.is_instantiated()
+
+
+def test_long_unification_chains():
+    Vs = n_Vars(20000)
+    mark = trail.mark()
+    for _ in unify_pairs(list(zip(Vs, Vs[1:]))):
+        for _ in unify(Vs[0], 'end'):
+            assert all(V.get_py_value() == 'end' for V in Vs)
+        assert Vs[-1] == Vs[0]
+        # Union-by-rank keeps the chains short, and path compression shortens them further.
+        assert all(V.unification_chain_next is None or
+                   V.unification_chain_next.unification_chain_next is None for V in Vs)
+    assert trail.mark() == mark
+    assert all(V.unification_chain_next is None for V in Vs)
+
+
+def test_unify_long_and_deep_terms():
+    n = 50000
+    Xs = n_Vars(n)
+    # Neither the length nor the nesting depth of the terms is limited by the recursion limit.
+    for _ in unify_sequences(Xs, range(n)):
+        assert [X.get_py_value() for X in Xs] == list(range(n))
+    (Deep_1, Deep_2) = (Structure(('leaf', 1)), Structure(('leaf', Xs[0])))
+    for _ in range(n):
+        (Deep_1, Deep_2) = (Structure(('s', Deep_1, 2)), Structure(('s', Deep_2, Xs[1])))
+    for _ in unify(Deep_1, Deep_2):
+        assert (Xs[0].get_py_value(), Xs[1].get_py_value()) == (1, 2)
+    assert not Xs[0].is_instantiated()
+
+
+def test_terms_are_compact():
+    (X, Y) = n_Vars(2)
+    assert all(type(term).__dictoffset__ == 0 for term in [X, PyValue(1), Structure(('f', X))])
+    # term_ids are allocated when a Var is first printed, and only then.
+    Y_str = str(Y)
+    assert str(Y) == Y_str == f'_{Y.term_id}'
+    assert X.term_id > Y.term_id
+
+
+def test_constants_are_interned():
+    (S1, S2) = (Structure(('f', 'a', 1, None)), Structure(('g', 'a', True, None)))
+    assert S1.args[0] is S2.args[0]
+    # 1 and True are equal but are not the same constant. Each None is a distinct uninstantiated PyValue.
+    assert S1.args[1] is not S2.args[1] and S1.args[2] is not S2.args[2]
+    for _ in unify(S1.args[2], 'b'):
+        assert S2.args[2].get_py_value() is None
+    # -0.0 and 0.0 are equal, but each keeps its sign.
+    (Zero, Minus_Zero) = (Structure(('f', 0.0)), Structure(('f', -0.0)))
+    assert (str(Zero), str(Minus_Zero), str(Structure(('f', 0.0)))) == ('f(0.0)', 'f(-0.0)', 'f(0.0)')
+    assert str(Minus_Zero.get_py_value()) == 'f(-0.0)' and Zero == Minus_Zero
+
+
+def test_ground_structures():
+    X = n_Vars(1)[0]
+    (G1, G2) = (Structure(('f', 1, Structure(('g', 'a')))), Structure(('f', 1, Structure(('g', 'b')))))
+    assert G1.is_ground() and G2.is_ground() and G1 != G2
+    assert G1 == Structure(('f', 1.0, Structure(('g', 'a'))))
+    # A Structure that is instantiated only because a Var is bound is not ground.
+    H = Structure(('f', 1, X))
+    for _ in unify(X, Structure(('g', 'a'))):
+        assert H.is_instantiated() and not H.is_ground() and H == G1
+    assert not H.is_instantiated()
+    assert list(unify(G1, G2)) == []
+
+
+def test_euc_dereferences_without_an_extra_frame():
+    (X, Y) = n_Vars(2)
+
+    @euc
+    def args_seen(A, B=None):
+        yield (A, B)
+
+    # The decorated function returns the original generator, not a wrapper generator.
+    assert args_seen(X).gi_code.co_name == 'args_seen'
+    for _ in unify(X, Y):
+        assert next(args_seen(X, B=X)) == (Y, Y)
+        assert next(euc(lambda *args: iter([args]))(X)) == (Y, )
+    # The args are dereferenced when the predicate is called, not when its generator first runs.
+    Z = n_Vars(1)[0]
+    made_before = args_seen(Z)
+    for _ in unify(Z, 1):
+        assert next(made_before)[0] is Z and next(args_seen(Z))[0] == PyValue(1)
+
+
+def test_cyclic_terms():
+    (V, W, X) = n_Vars(3)
+    T = Structure(('t', 1, V))
+    for _ in unify(T, V):
+        # Without the occurs check, T is now t(1, t(1, t(1, ...))).
+        assert str(T) == str(V) == 't(1, ...)'
+        assert T.is_instantiated() and T == Structure(('t', 1, T))
+        assert str(T.get_py_value()) == 't(1, t(1, ...))'
+        U = Structure(('t', 1, W))
+        for _ in unify(U, W):
+            assert T == U and T != Structure(('t', 2, W))
+    L = LinkedList((1, X))
+    for _ in unify(X, L):
+        assert (str(L), L.get_py_value()) == ('[1 | ...]', [1])
+
+
+def test_occurs_check():
+    (V, X, Y) = n_Vars(3)
+    logic_variables.occurs_check = True
+    try:
+        assert list(unify(Structure(('t', 1, V)), V)) == []
+        assert list(unify(Structure(('f', X)), Structure(('f', Structure(('g', Structure(('h', X)))))))) == []
+        assert [str(X) for _ in unify(Structure(('f', X)), Structure(('f', Structure(('g', Y)))))] == [f'g({Y})']
+    finally:
+        logic_variables.occurs_check = False
+
+
+def test_fd_domains_narrow_and_are_restored():
+    (X, Y, Z) = (FDVar(range(3)), FDVar(range(2, 5)), n_Vars(1)[0])
+    mark = trail.mark()
+    assert list(unify(X, 5)) == []
+    for _ in unify_pairs([(Z, X), (X, Y)]):
+        # The intersection of the domains has one value, which X, Y, and Z all take.
+        assert (X.get_py_value(), Y.get_py_value(), Z.get_py_value()) == (2, 2, 2)
+    assert (domain_of(X), domain_of(Y), Z.is_instantiated()) == ({0, 1, 2}, {2, 3, 4}, False)
+    assert trail.mark() == mark
+
+
+def test_fd_constraints_propagate():
+    Xs = [FDVar(range(1, 7)) for _ in range(3)]
+    for _ in sum_equals(Xs, 17):
+        assert all(domain_of(X) == {5, 6} for X in Xs)
+        for _ in unify(Xs[0], 5):
+            assert [X.get_py_value() for X in Xs] == [5, 6, 6]
+        for _ in all_different(Xs):
+            assert False
+    (A, B) = (FDVar(range(3)), FDVar([1]))
+    for _ in not_equal(A, B):
+        assert domain_of(A) == {0, 2}
+    assert domain_of(A) == {0, 1, 2}
+
+
+def test_fd_labeling():
+    Xs = [FDVar(range(4)) for _ in range(4)]
+    permutations = [[X.get_py_value() for X in Xs] for _ in all_different(Xs) for _ in label(Xs)]
+    assert len(permutations) == 24 and permutations[:2] == [[0, 1, 2, 3], [0, 1, 3, 2]]
+    # Weighted sums: 2*X - Y == 3.
+    (X, Y) = (FDVar(range(5)), FDVar(range(5)))
+    assert [(X.get_py_value(), Y.get_py_value()) for _ in sum_equals([X, Y], 3, [2, -1]) for _ in label([X, Y])] == \
+           [(2, 1), (3, 3)]
+
+
+def test_copies_and_variants():
+    (X, Y, Z) = n_Vars(3)
+    Terms = [X, Structure(('f', Y, X, Structure(('g', 1))))]
+    assert variant_key(Terms) == variant_key([Z, Structure(('f', X, Z, Structure(('g', 1))))])
+    assert variant_key(Terms) != variant_key([X, Structure(('f', X, X, Structure(('g', 1))))])
+    for _ in unify(Y, 'a'):
+        (X_copy, S_copy) = copy_terms(Terms)
+    assert str(S_copy) == f"f(a, {X_copy}, g(1))" and S_copy.args[1] is X_copy and X_copy is not X
+    assert S_copy.args[2] is Terms[1].args[2]
@@ -0,0 +1,115 @@
+import pickle
+from itertools import islice
+
+from pylog.logic_variables import n_Vars, PyValue, Structure, StructureItem, unify, Var
+from pylog.sequence_options.sequences import append, PyList, PySet, PyTuple
+from pylog.sequence_options.linked_list import LinkedList
+from pylog.sequence_options.super_sequence import is_a_subsequence_of, is_contiguous_in, member, members, next_to
+
+
+class House(StructureItem):
+    pass
+
+
+def test_tails_and_slices_are_views():
+    Xs = PyList([1, 2, 3, 4, 5])
+    T = Xs.tail().tail()
+    # A view shares the args of the sequence it was taken from. Its own args are made only when needed.
+    assert T._base is Xs.args and (len(T), T.head().get_py_value(), T[-1].get_py_value()) == (3, 3, 5)
+    assert isinstance(T, PyList) and T.to_python_list() == list(T.args) and T.get_py_value() == [3, 4, 5]
+    assert (str(T[1:]), str(T[::-1])) == ('[4, 5]', '[5, 4, 3]')
+    assert Xs[5:].is_empty() and Xs[4:2].is_empty() and not T.is_empty()
+    assert T.is_ground() and T == PyList([3, 4, 5]) and pickle.loads(pickle.dumps(T)) == T
+    assert (str(PyTuple((1, 2))[1:]), str(PySet({1}).tail())) == ('(2, )', '{}')
+
+
+def test_views_unify_like_sequences():
+    (X, Y) = n_Vars(2)
+    Ys = PyTuple((X, 'b', Y))
+    for _ in unify(Ys[1:], PyTuple(('b', 'c'))):
+        assert Y.get_py_value() == 'c' and str(Ys) == f"({X}, b, c)"
+    assert not Y.is_instantiated()
+    Z = Var()
+    assert [Z.get_py_value() for _ in member(Z, PyList(range(5))[2:])] == [2, 3, 4]
+    assert len(list(is_a_subsequence_of([PyValue(1), PyValue(3)], PyList([1, 2, 3, 1, 3])))) == 3
+
+
+def test_member_of_long_sequences():
+    X = Var()
+    Xs = PyList(range(50000))
+    # One frame, whatever the length.
+    assert sum(1 for _ in member(X, Xs)) == 50000 and not X.is_instantiated()
+    assert len(list(member(PyValue(49999), Xs))) == 1 and len(list(member(49999, Xs))) == 1
+    # Elements that can't match are skipped. The order of the solutions is unchanged.
+    Y = Var()
+    Ys = PyTuple((Structure(('f', 1)), 1, Structure(('g', 2)), Y, Structure(('f', 2, 3)), Structure(('f', 4))))
+    assert [str(X) for _ in member(Structure(('f', X)), Ys)] == ['1', str(X), '4']
+    assert [str(X) for _ in member(X, Ys)] == ['f(1)', '1', 'g(2)', str(Y), 'f(2, 3)', 'f(4)']
+    assert [(X.get_py_value(), Y.get_py_value()) for _ in members([X, Y], PyList([1, 2]))] == \
+           [(1, 1), (1, 2), (2, 1), (2, 2)]
+    # Open-ended LinkedLists are extended as before.
+    Zs = LinkedList((2, Var()))
+    assert [str(Zs).split(' | ')[0] for _ in islice(member(1, Zs), 1)] == ['[2, 1']
+    assert [str(Zs).count(',') for _ in islice(member(1, Zs), 3)] == [1, 2, 3]
+
+
+def test_py_sets_index_their_ground_elements():
+    S = PySet([1, 2, 2, 3, Structure(('f', 1)), Structure(('f', 1))])
+    assert len(S) == 4 and str(S) == '{1, 2, 3, f(1)}'
+    T = S.discard(PyValue(2))
+    # A discard that removes nothing returns the same set.
+    assert str(T) == '{1, 3, f(1)}' and len(T) == 3 and T.discard(PyValue(9)) is T and len(S) == 4
+    (X, Y) = n_Vars(2)
+    assert len(list(member(Structure(('f', 1)), S))) == 1 and not list(member(PyValue(2), T))
+    for _ in unify(X, 3):
+        assert len(list(member(X, T))) == 1 and str(T.discard(X)) == '{1, f(1)}'
+    assert [str(X) for _ in member(X, T)] == ['1', '3', 'f(1)']
+    # Non-ground elements are kept, in order, and member tries them in order.
+    U = PySet([1, Y, 2])
+    assert len(U) == 3 and [str(X) for _ in member(X, U)] == ['1', str(Y), '2']
+    assert str(U.discard(PyValue(1))) == f'{{{Y}, 2}}'
+    assert str(S.tail().discard(PyValue(3))) == '{2, f(1)}' and len(list(member(PyValue(1), S.tail()))) == 0
+    assert [Y.get_py_value() for _ in unify(PySet([1, Y]), T.discard(Structure(('f', 1))))] == [3]
+
+
+def test_py_sets_index_structures_as_unify_sees_them():
+    # A StructureItem unifies with a plain Structure that has its functor and args. So it is the same element.
+    (H, S) = (House(('red', 'dog')), Structure(('house', 'red', 'dog')))
+    Houses = PySet([H, 1, S])
+    assert len(list(unify(H, S))) == 1 and len(Houses) == 2
+    assert len(list(member(S, Houses))) == len(list(member(S, PyList([H, 1])))) == 1
+    assert str(Houses.discard(S)) == '{1}' and len(list(member(Structure(('house', 'red')), Houses))) == 0
+
+
+def test_append_splits_with_views():
+    (Xs, Ys, Zs) = n_Vars(3)
+    Long = PyList(range(5000))
+    # Each split is a pair of views of Long.
+    splits = [(len(Xs.unification_chain_end()), Ys.unification_chain_end()._base is Long.args)
+              for _ in append(Xs, Ys, Long)]
+    assert len(splits) == 5001 and splits[:2] == [(0, True), (1, True)]
+    # A known length picks the one split that could work.
+    assert [Ys.get_py_value()[:2] for _ in append(PyList([0, 1]), Ys, Long)] == [[2, 3]]
+    assert [Xs.get_py_value()[-1] for _ in append(Xs, PyList([4999]), Long)] == [4998]
+    assert list(append(PyList([1]), Ys, Long)) == [] and list(append(PyTuple((0, )), Ys, Long)) == []
+    assert [Zs.get_py_value() for _ in append(PyList([1]), PyList([2, 3]), Zs)] == [[1, 2, 3]]
+    assert str(PyTuple((1, 2)) + PyTuple((3, ))) == '(1, 2, 3)'
+
+
+def test_contiguous_sublists_of_long_sequences():
+    (X, Y) = n_Vars(2)
+    Long = PyList([i % 97 for i in range(20000)])
+    # Only the offsets at which the longest ground run, (6, 7), lines up are tried.
+    assert list(Long.feasible_offsets([4, X, 6, 7]))[:2] == [4, 101]
+    assert len(list(Long.feasible_offsets([X, Y]))) == 19999
+    assert [X.get_py_value() for _ in is_contiguous_in([X, 6, 7], Long)][:2] == [5, 5]
+    assert len(list(is_contiguous_in([96, 0, 1], Long))) == 206
+    # Uninstantiated elements of the sequence may match anything.
+    Mixed = PyTuple((1, X, 3, 2, Y, 1))
+    assert [(str(X), str(Y)) for _ in is_contiguous_in([2, 3], Mixed)] == [('2', str(Y)), (str(X), '3')]
+    assert [(str(X), str(Y)) for _ in next_to(PyValue(2), PyValue(1), Mixed)] == \
+           [(str(X), '1'), (str(X), '2'), ('2', str(Y))]
+    # Elements are matched as unify matches them, whatever their classes.
+    House_Row = PyList([House(('red', 'dog')), 1])
+    assert list(House_Row.feasible_offsets([Structure(('house', 'red', 'dog'))])) == [0]
+    assert len(list(is_contiguous_in([Structure(('house', 'red', 'dog'))], House_Row))) == 1